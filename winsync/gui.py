@@ -2,13 +2,39 @@ from tkinter import *
 from tkinter.font import *
 import winsync.lib.config as config
 
+import contextlib
 import logging
 import logging.handlers
-import queue, sys
+import queue, re, sys
 
 #This is the format used to display the messages in the window
 format_template = '{levelname} ({name}): {message}'
 
+#These regular expressions are used to scan the wget log file. They are
+#compiled once here because read_wget_log runs them against every log
+#line twice a second during a download.
+ignore_failed_line_re = re.compile('^[ \t]*[0-9]K')
+percentage_re = re.compile('([0-9]{1,3}%)')
+
+#Win32 constants for FindFirstChangeNotification, used to watch the
+#wget log file for growth instead of polling it on a timer.
+FILE_NOTIFY_CHANGE_SIZE = 0x00000008
+FILE_NOTIFY_CHANGE_LAST_WRITE = 0x00000010
+INVALID_HANDLE_VALUE = -1
+
+@contextlib.contextmanager
+def editable(text):
+    """Temporarily make the given Text widget writable. The widget is kept
+    disabled so the user cannot type in the log window, every update has
+    to be bracketed by a pair of state toggles. Each toggle is a Tcl
+    roundtrip, so batch all the writes for one update under one of these.
+    """
+    text.config(state=NORMAL)
+    try:
+        yield text
+    finally:
+        text.config(state=DISABLED)
+
 class App:
     def __init__(self, master):
         self.wget_watcher = None
@@ -52,29 +78,24 @@ class App:
         #Font varients used in the log window
         normal = Font(family='Lucida Console', size=12)
         bold = Font(family='Lucida Console', size=12, weight=BOLD)
-        
+
         #Declare the formatting for the log messages, the tag names are
-        #the string names for the various log levels.
-        self.text.tag_config('CRITICAL', foreground='white',
-                             background='#500', font=normal,
-                             spacing1=2, spacing3=2,
-                             lmargin1=2, lmargin2=2)
-        self.text.tag_config('ERROR', foreground='#CF3838', font=normal,
-                             spacing1=2, spacing3=2,
-                             lmargin1=2, lmargin2=2)
-        self.text.tag_config('WARNING', foreground='#DEB350', font=normal,
-                             spacing1=2, spacing3=2,
-                             lmargin1=2, lmargin2=2)
-        self.text.tag_config('INFO', foreground='#080', font=normal,
-                             spacing1=2, spacing3=2,
-                             lmargin1=2, lmargin2=2)
-        self.text.tag_config('DEBUG', foreground='black', font=normal,
-                             spacing1=2, spacing3=2,
-                             lmargin1=2, lmargin2=2)
-        self.text.tag_config('DOWNLOAD', foreground='yellow',
-                             background='blue', font=bold,
-                             spacing1=2, spacing3=2,
-                             lmargin1=2, lmargin2=2)
+        #the string names for the various log levels. The spacing and
+        #margin options are shared by every tag, only the colors (and
+        #the DOWNLOAD font) differ.
+        common = dict(font=normal, spacing1=2, spacing3=2,
+                      lmargin1=2, lmargin2=2)
+        tag_styles = (
+            ('CRITICAL', dict(foreground='white', background='#500')),
+            ('ERROR', dict(foreground='#CF3838')),
+            ('WARNING', dict(foreground='#DEB350')),
+            ('INFO', dict(foreground='#080')),
+            ('DEBUG', dict(foreground='black')),
+            ('DOWNLOAD', dict(foreground='yellow', background='blue',
+                              font=bold)),
+        )
+        for tag, extra in tag_styles:
+            self.text.tag_config(tag, **dict(common, **extra))
         
         #A quit button
         self.quitbtn = Button(self.frame, text="QUIT", command=sys.exit)
@@ -98,8 +119,10 @@ class App:
         config.init_config(winsync_location, True)
         config.start_logger()
         
-        #Tie the main logger and the GUI together using a Queue
-        self.log_queue = queue.Queue()
+        #Tie the main logger and the GUI together using a queue.
+        #SimpleQueue is built for this multi-producer/single-consumer
+        #case and has cheaper put/get than the locking queue.Queue.
+        self.log_queue = queue.SimpleQueue()
         
         #This will enqueue log records emitted by the winsync
         #thread for later processing
@@ -113,9 +136,8 @@ class App:
         self.formatter = logging.Formatter(format_template, style='{')
         
         #Clear the text window in case winsync has been restarted
-        self.text.config(state=NORMAL)
-        self.text.delete(1.0, END)
-        self.text.config(state=DISABLED)
+        with editable(self.text):
+            self.text.delete(1.0, END)
         
         #Start processing the log queue every 250ms.
         root.after(250,self.show_log)
@@ -143,45 +165,75 @@ class App:
             self.read_wget_log()
     
     def read_wget_log(self):
-        import re
+        import ctypes
+        import os.path
+
+        with editable(self.text):
+            self.text.insert(END, '\n', 'DOWNLOAD')
+
+        #Ask Windows to signal us when the log's directory changes so the
+        #watcher thread blocks in the kernel between updates instead of
+        #waking up on a timer. If the notification cannot be created we
+        #fall back to sleep polling.
+        kernel32 = ctypes.windll.kernel32
+        change_handle = kernel32.FindFirstChangeNotificationW(
+                            os.path.dirname(config.wget_download_log),
+                            False,
+                            FILE_NOTIFY_CHANGE_SIZE |
+                            FILE_NOTIFY_CHANGE_LAST_WRITE)
+
+        if change_handle == INVALID_HANDLE_VALUE:
+            change_handle = None
+
+        try:
+            self.tail_wget_log(kernel32, change_handle)
+        finally:
+            if change_handle is not None:
+                kernel32.FindCloseChangeNotification(change_handle)
+
+    def tail_wget_log(self, kernel32, change_handle):
+        """Follow the wget log until the download finishes or fails,
+        updating the text widget with the download's progress. The
+        change_handle parameter is a Win32 change notification for the
+        log's directory, or None to fall back to sleep polling.
+        """
         import time
-        
-        failed = re.compile('failed')
-        ignore_failed_line = re.compile('^[ \t]*[0-9]K')
-        percentage_re = re.compile('([0-9]{1,3}%)')
+
         finished = False
-        
-        self.text.config(state=NORMAL)
-        self.text.insert(END, '\n', 'DOWNLOAD')
-        self.text.config(state=DISABLED)
-        
+        last_pct = None
+
         with open(config.wget_download_log, 'r') as log_file:
             while True:
                 for line in log_file:
                     #Check if the download failed. If so output the entire
                     #log file except lines with the dots
-                    if failed.search(line):
+                    #A plain substring test beats regex dispatch for a
+                    #fixed word, and this check runs on every log line
+                    if 'failed' in line:
                         time.sleep(1) #Give wget time to finish up
                         log_file.seek(0)
-                        self.text.config(state=NORMAL)
-                        for line in log_file:
-                            if not ignore_failed_line.search(line):
-                                self.text.insert(END, '\n')
-                                self.text.insert(END, line, 'ERROR')
-                        self.text.config(state=DISABLED)
+                        with editable(self.text):
+                            for line in log_file:
+                                if not ignore_failed_line_re.search(line):
+                                    self.text.insert(END, '\n')
+                                    self.text.insert(END, line, 'ERROR')
                         return
                 
                     #Only output the highest percentatge of the download so far
                     m = percentage_re.search(line)
-                    #Output the download percentage
-                    if m:
-                        self.text.config(state=NORMAL)
-                        self.text.delete('{}-1l'.format(INSERT), INSERT)
-                        self.text.insert(INSERT, 'Downloading: {}\n'.format(m.group(1)), 'DOWNLOAD')
-                        self.text.config(state=DISABLED)
-                        
+                    #Output the download percentage, but only rewrite the
+                    #line when the percentage actually changed. wget emits
+                    #many progress dots per percent, rewriting the Text
+                    #line for each one is wasted redrawing.
+                    if m and m.group(1) != last_pct:
+                        last_pct = m.group(1)
+
+                        with editable(self.text):
+                            self.text.delete('{}-1l'.format(INSERT), INSERT)
+                            self.text.insert(INSERT, 'Downloading: {}\n'.format(last_pct), 'DOWNLOAD')
+
                         #See if we are finished downloading
-                        if '100' in m.group(1):
+                        if last_pct == '100%':
                             finished = True
                             break
                         
@@ -190,8 +242,13 @@ class App:
                     config.wget_exit_barrier.wait()
                     return
                 
-                #Wait for the log file to update
-                time.sleep(0.5)
+                #Wait for the log file to update. The wait has a timeout
+                #so a missed notification cannot hang the watcher thread.
+                if change_handle is not None:
+                    kernel32.WaitForSingleObject(change_handle, 500)
+                    kernel32.FindNextChangeNotification(change_handle)
+                else:
+                    time.sleep(0.5)
 
     def run_winsync(self):
         import winsync.run
@@ -201,27 +258,50 @@ class App:
         
     
     def show_log(self):
-        while not self.log_queue.empty():
-            record = self.log_queue.get(block=True)
-            
-            output = self.formatter.format(record)
-            
-            #Only autoscroll the window if the scroll bar is at
-            #the bottom *before* adding the new text
+        #Drain the whole queue in one go. Pulling the records one at a
+        #time with empty()/get() is racy and makes a Tk roundtrip per
+        #record, which lags badly when installers log in bursts.
+        records = []
+        try:
+            while True:
+                records.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        if records:
+            #Only autoscroll the window if the scroll bar is at the
+            #bottom *before* adding the new text. One sample per tick is
+            #enough, the user cannot scroll between records in a batch.
             scroll_location = self.yscrollbar.get()
-            
-            #Add the text to the window, then disable it
-            self.text.config(state=NORMAL)
-            self.text.insert(END, output, record.levelname)
-            self.text.insert(END, '\n')
-            self.text.config(state=DISABLED)
+
+            with editable(self.text):
+                #Group consecutive records with the same level so each
+                #group becomes a single insert with a single tag
+                group = []
+                levelname = records[0].levelname
+                for record in records:
+                    if record.levelname != levelname:
+                        self.insert_group(group, levelname)
+                        group = []
+                        levelname = record.levelname
+
+                    group.append(self.formatter.format(record))
+
+                self.insert_group(group, levelname)
 
             #Autoscroll if the scrollbar was at the bottom.
             if scroll_location[1] == 1.0:
                 self.text.yview(END)
-            
+
         root.after(250,self.show_log)
 
+    def insert_group(self, group, levelname):
+        """Insert a batch of formatted log messages that share a level tag.
+        The caller is responsible for setting the text widget's state.
+        """
+        self.text.insert(END, '\n'.join(group), levelname)
+        self.text.insert(END, '\n')
+
 if __name__ == '__main__':
     root = Tk()
     app = App(root)
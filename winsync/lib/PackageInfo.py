@@ -1,5 +1,7 @@
 from winsync.lib.config import logger
 import winsync.lib.util as util
+import ast
+import io
 import os.path
 
 #Import the proper config parser, for python 2 or 3
@@ -11,7 +13,22 @@ except ImportError:
     from configparser import SafeConfigParser
 
 class PackageInfo:
-    def __init__(self, pkg_id, pkg_dict={}, skip_dependents=False, 
+    #The fields written out by save_to_cache and write_to_info_file, as
+    #(option, serializer) pairs. Adding a new field is a one-line change.
+    _CACHE_FIELDS = (('name', str), ('installer', str), ('version', str),
+                     ('priority', str), ('meta', str))
+    _INFO_FIELDS = (('name', str), ('version', str), ('priority', str),
+                    ('meta', str), ('reboot', str))
+
+    #Cache of (mtime, parser) pairs keyed by the info file's path.
+    #Recursive dependency and chain rebuilds can construct the same
+    #package several times in one run, this lets them reuse the parsed
+    #ini instead of re-reading the file each time. The mtime makes the
+    #entry self-invalidating: whenever download_info rewrites the file,
+    #the stored parse no longer matches and is rebuilt.
+    _parser_cache = {}
+
+    def __init__(self, pkg_id, pkg_dict=None, skip_dependents=False,
                   skip_download=False, make_empty=False,
                   info_dir=None):
         """Construct the object using the given package id. The id should
@@ -39,7 +56,12 @@ class PackageInfo:
         global logger
         import winsync.lib.rget as rget
         import winsync.lib.config as config
-        
+
+        #A default dictionary literal would be shared between every
+        #instance, so allocate a fresh one per call instead
+        if pkg_dict is None:
+            pkg_dict = {}
+
         self.id = pkg_id
         self.pkg_dict = pkg_dict
         self.ini_file = self.id + '.ini'
@@ -65,8 +87,18 @@ class PackageInfo:
                            '{}'.format(self.pkg_info_file))
 
         
-        #Read out the information in the ini file
-        self.parser.read(self.pkg_info_file)
+        #Read out the information in the ini file, reusing a previous
+        #parse of the same file as long as the file has not changed
+        #underneath it
+        mtime = os.path.getmtime(self.pkg_info_file)
+        cached = PackageInfo._parser_cache.get(self.pkg_info_file)
+        if cached is not None and cached[0] == mtime:
+            parser = cached[1]
+        else:
+            parser = self.parser
+            parser.read(self.pkg_info_file)
+            PackageInfo._parser_cache[self.pkg_info_file] = (mtime, parser)
+        self.parser = parser
         
         #Add fields to this object using values from the pkg info file
         self.check_option('name', required=True)
@@ -79,8 +111,9 @@ class PackageInfo:
         self.check_option('depend', is_expression=True, default='[]')
         self.check_option('chain', is_expression=True, default='[]')
         
-        #This is a list of all the packages the depend on this package
-        self.source = []
+        #This is the set of all the packages that depend on this package.
+        #A set so that popular packages dedup their sources in O(1).
+        self.source = set()
         
         #Add this package to the global repository of packages
         if self.pkg_dict is not None:
@@ -106,8 +139,11 @@ class PackageInfo:
         interpret the value of the options. They are mutually exclusive.
         """
 
+        parser = self.parser
+        key = option.lower()
+
         #See if the option exists
-        if not self.parser.has_option('package', option):
+        if not parser.has_option('package', option):
             #If the option did not exist in the file but it is
             #required then emit an error
             if required:
@@ -118,20 +154,24 @@ class PackageInfo:
             #This is an optional value, so set the default
             #value to what was passed in or None
             else:
-                self.parser.set('package', option, str(default))
-            
+                parser.set('package', option, str(default))
+
         if is_boolean:
-            #Add the field as a boolean value
-            self.__dict__[option.lower()] = self.parser.getboolean('package', option)
+            #Interpret the field as a boolean value
+            value = parser.getboolean('package', option)
         elif is_int:
-            #Add the field as a boolean value
-            self.__dict__[option.lower()] = self.parser.getint('package', option)
+            #Interpret the field as an integer value
+            value = parser.getint('package', option)
         elif is_expression:
-            #Add the field by evaluating the expression
-            self.__dict__[option.lower()] = eval(self.parser.get('package', option))
+            #Interpret the field by evaluating the expression. These
+            #values are always literal lists, so literal_eval is both
+            #faster and safer than handing ini file contents to eval()
+            value = ast.literal_eval(parser.get('package', option))
         else:
-            #Add the field as a string value
-            self.__dict__[option.lower()] = self.parser.get('package', option)
+            #Interpret the field as a string value
+            value = parser.get('package', option)
+
+        setattr(self, key, value)
             
     def build_dependencies(self):
         """This function goes through the list of dependents
@@ -163,10 +203,13 @@ class PackageInfo:
                 
                 
             #Make sure that the dependecy package has a
-            #higher priority than this package so it installs first
-            if pkg.priority <= self.priority:
-                pkg.priority = self.priority + 1
-                
+            #higher priority than this package so it installs first.
+            #Only recurse when the priority actually changed, otherwise
+            #diamond dependency graphs re-walk the same subtree.
+            new_priority = self.priority + 1
+            if pkg.priority < new_priority:
+                pkg.priority = new_priority
+
                 #Because dependencies can be chained we need to
                 #recursively rebuild the package's dependency list
                 #effectively updating all their priorities.
@@ -178,7 +221,7 @@ class PackageInfo:
             if not self.id in pkg.source:
                 logger.debug('Package {} became a source for package {}'.format(
                               self.id, pkg.id))
-                pkg.source.append(self.id)
+                pkg.source.add(self.id)
             
     def build_chained(self):
         """This function goes through the list of chained packages
@@ -208,11 +251,14 @@ class PackageInfo:
             else:
                 pkg = self.pkg_dict[d]
                 
-            #Make sure that the dependant package has a
-            #higher priority than this package so it installs first
-            if pkg.priority >= self.priority:
-                pkg.priority = self.priority - 1
-                
+            #Make sure that the chained package has a
+            #lower priority than this package so it installs later.
+            #Only recurse when the priority actually changed, otherwise
+            #diamond chain graphs re-walk the same subtree.
+            new_priority = self.priority - 1
+            if pkg.priority > new_priority:
+                pkg.priority = new_priority
+
                 #Because chains can be in turn be chained we need to
                 #recursively rebuild the package's chain list
                 #effectively updating all their priorities.
@@ -224,7 +270,7 @@ class PackageInfo:
             if not self.id in pkg.source:
                 logger.debug('Package {} became a source for package {}'.format(
                               self.id, pkg.id))
-                pkg.source.append(self.id)
+                pkg.source.add(self.id)
 
     def save_to_cache(self, parser):
         """This method will ouput this object into the given ConfigParser.
@@ -242,11 +288,8 @@ class PackageInfo:
             parser.add_section(self.id)
         
         #Set all the options
-        parser.set(self.id, 'name', self.name)
-        parser.set(self.id, 'installer', self.installer)
-        parser.set(self.id, 'version', self.version)
-        parser.set(self.id, 'priority', str(self.priority))
-        parser.set(self.id, 'meta', str(self.meta))
+        for option, serialize in self._CACHE_FIELDS:
+            parser.set(self.id, option, serialize(getattr(self, option)))
     
     def write_to_info_file(self, parser=None):
         """This method will write all the pertient information in this object
@@ -263,30 +306,43 @@ class PackageInfo:
             parser.add_section('package')
         
         #Set all the required the options
-        parser.set('package', 'name', self.name)
-        parser.set('package', 'version', str(self.version))
-        parser.set('package', 'priority', str(self.priority))
-        parser.set('package', 'meta', str(self.meta))
-        parser.set('package', 'reboot', str(self.reboot))
-        
+        for option, serialize in self._INFO_FIELDS:
+            parser.set('package', option, serialize(getattr(self, option)))
+
         if self.installer is None or \
            self.installer == b'' or \
            self.installer == '':
             parser.set('package', 'installer', 'None')
         else:
             parser.set('package', 'installer', self.installer)
-        
+
         #Set the optional parameters if they are defined
-        if hasattr(self, 'depend') and self.depend is not []:
-            parser.set('package', 'depend', repr(sorted(self.depend)))
-        if hasattr(self, 'chain') and self.chain is not []:
-            parser.set('package', 'chain', repr(sorted(self.chain)))
-        if hasattr(self, 'files') and self.files is not []:
-            parser.set('package', 'files', repr(sorted(self.files)))
+        for option in ('depend', 'chain', 'files'):
+            if hasattr(self, option):
+                parser.set('package', option,
+                           repr(sorted(getattr(self, option))))
         
+        #Serialize the file into memory first, so we can skip the write
+        #entirely when nothing has actually changed
+        buffer = io.StringIO()
+        parser.write(buffer)
+        new_contents = buffer.getvalue()
+
+        try:
+            with open(self.pkg_info_file, 'r', encoding='utf-8') as pkg_file:
+                old_contents = pkg_file.read()
+        except OSError:
+            old_contents = None
+
         #Write the information file
-        with open(self.pkg_info_file, 'w', encoding='utf-8') as pkg_file:
-            parser.write(pkg_file)
+        if new_contents != old_contents:
+            with open(self.pkg_info_file, 'w', encoding='utf-8') as pkg_file:
+                pkg_file.write(new_contents)
+
+        #The written parser is now the authoritative parse of the file,
+        #so later constructions of this package can share it
+        PackageInfo._parser_cache[self.pkg_info_file] = (
+            os.path.getmtime(self.pkg_info_file), parser)
         
     def add_to_queue(self, prioity_queue):
         """This method adds this object to the given priority queue.
@@ -310,10 +366,8 @@ class PackageInfo:
         #Flask returns the list as unicode characters this creates
         #problems when reading/writting files between python 2 and 3
         #To fix this we are re-encoding them into ascii
-        self.depend = sorted(map(lambda x: x.encode('ascii'), 
-                                   form.getlist('depend')))
-        self.chain = sorted(map(lambda x: x.encode('ascii'), 
-                                  form.getlist('chain')))
+        self.depend = sorted(x.encode('ascii') for x in form.getlist('depend'))
+        self.chain = sorted(x.encode('ascii') for x in form.getlist('chain'))
     
     def __str__(self):
         return self.name
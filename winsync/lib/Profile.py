@@ -1,6 +1,8 @@
 from winsync.lib.config import logger
 import winsync.lib.config as config
 import winsync.lib.util as util
+import ast
+import functools
 import os.path
 import re
 
@@ -18,6 +20,15 @@ else:
     profiles_file = os.path.abspath( './profiles.ini' )
 
 
+@functools.lru_cache(maxsize=256)
+def _compile_match(pattern):
+    """Compile and cache a profile's match regular expression. Profiles are
+    re-read on every sync, so caching by pattern string means each unique
+    expression is only compiled once per process. Compiled patterns are
+    immutable so sharing them between Profile objects is safe.
+    """
+    return re.compile(pattern)
+
 def get_all_profiles():
     """This function returns a dictionary of all the profiles in the
     profiles.ini file. The dictionary keys are the profile id's (section
@@ -81,7 +92,7 @@ class Profile:
     The packages attribute stores a list of package id's that specify what
     packages are to by installed by this profile.
     """
-    def __init__( self, id, variable='', match='', packages=[], empty=False ):
+    def __init__( self, id, variable='', match='', packages=None, empty=False ):
         """Initializes the object. The parameters correspond to the attributes
         described above, excpet for the empty parameter. If the empty parameter
         is True then all the parameters except for the id, are ignored. You
@@ -93,16 +104,24 @@ class Profile:
         will throw an exception.
         """
         self.id = id
-        
+
+        #Caches the last (sysinfo value, matched?) pair seen by applies()
+        self._last_match = None
+
         if empty:
             return
-        
+
+        #A default list literal would be shared between every instance,
+        #so allocate a fresh one per call instead
+        if packages is None:
+            packages = []
+
         self.variable = variable
         self.packages = packages
         
         #Make sure the regex is good
-        self.re = re.compile( match )
-        
+        self.re = _compile_match( match )
+
         self.match = match
         
     def from_parser( self, parser ):
@@ -115,14 +134,21 @@ class Profile:
         As with the constructor, the regular expression in the match attribute
         is compiled to it check for validity.
         """
-        self.variable = parser.get( self.id, 'variable' )
-        
+        #Fetch the whole section in one call rather than paying a
+        #per-option lookup through the parser
+        section = dict( parser.items( self.id ) )
+
+        self.variable = section['variable']
+
         #Make sure the regex is good
-        tmp_match = parser.get( self.id, 'match' )
-        self.re = re.compile( tmp_match )
+        tmp_match = section['match']
+        self.re = _compile_match( tmp_match )
         self.match = tmp_match
-        
-        self.packages = eval(parser.get( self.id, 'packages' ))
+        self._last_match = None
+
+        #The packages value is always a literal list, so literal_eval is
+        #both faster and safer than handing ini file contents to eval()
+        self.packages = ast.literal_eval( section['packages'] )
         
     def from_form( self, form ):
         """This method is used by the repo.py file to fill in the Profile
@@ -137,14 +163,14 @@ class Profile:
         #Flask returns the list as unicode characters this creates
         #problems when reading/writting files between python 2 and 3
         #To fix this we are re-encoding them into ascii
-        self.packages = map( lambda x: x.encode('ascii'), 
-                             form.getlist( 'packages' ) )
+        self.packages = [x.encode('ascii') for x in form.getlist( 'packages' )]
         
         
         #Make sure the regex is good
         tmp_match = form.get( 'match' )
-        self.re = re.compile( tmp_match )
+        self.re = _compile_match( tmp_match )
         self.match = tmp_match
+        self._last_match = None
 
     def save_to_parser( self, parser ):
         """This method saves this object's state to the given ConfigParser.
@@ -172,5 +198,15 @@ class Profile:
         return package_list
 
     def applies( self ):
-        return (self.variable in config.sysinfo) and \
-               self.re.match( config.sysinfo[self.variable] )
+        #Profiles that target a variable this machine does not define
+        #never need to run the regex at all
+        value = config.sysinfo.get( self.variable )
+        if value is None:
+            return False
+
+        #sysinfo rarely changes within a run, so remember the result
+        #for the last value we matched against
+        if self._last_match is None or self._last_match[0] != value:
+            self._last_match = (value, self.re.match( value ) is not None)
+
+        return self._last_match[1]
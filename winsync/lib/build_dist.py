@@ -1,46 +1,115 @@
-import os, os.path, platform, subprocess, shutil, sys
+import concurrent.futures
+import contextlib
+import os, os.path, platform, shutil, subprocess, sys
 import winsync
+import winsync.lib.setup as setup_script
 
-#Get the python executable's path
-python_exe = sys.executable
+@contextlib.contextmanager
+def setup_args(args):
+    """Temporarily replace sys.argv with the given distutils command line
+    and restore it, along with the current directory, afterwards. This
+    lets the setup script run in-process instead of paying two fresh
+    interpreter startups per build.
+    """
+    saved_argv = sys.argv
+    saved_dir = os.getcwd()
+    sys.argv = ['setup.py'] + args
+    try:
+        yield
+    finally:
+        sys.argv = saved_argv
+        os.chdir(saved_dir)
 
-#Save the current directory
-old_dir = os.getcwd()
+def link_or_copy(src, dst):
+    """Hardlink src to dst, falling back to a real copy when the
+    filesystem does not support links. A hardlink is a pure metadata
+    operation, so the common same-volume case moves no file data.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
 
-#Change directory to site-packages where winsync is currently installed
-os.chdir(os.path.realpath(
-    os.path.join(os.path.split(winsync.__file__)[0], '..' )))
+#This is where the finished install files are delivered
+dest_dir = os.getcwd()
+
+#This is the parent of site-packages where winsync is currently
+#installed. Everything below works with absolute paths rooted here, so
+#the process-wide working directory never has to change. abspath is a
+#pure string normalization, unlike realpath it does not resolve
+#symlinks with a filesystem call per path component. __file__ is None
+#when winsync is imported as a namespace package, fall back to the
+#package's search path in that case.
+if winsync.__file__ is not None:
+    package_dir = os.path.dirname(os.path.abspath(winsync.__file__))
+else:
+    package_dir = os.path.abspath(next(iter(winsync.__path__)))
+install_root = os.path.dirname(package_dir)
 
 #Copy the setup to a better build location
-shutil.copyfile('./winsync/lib/setup.py', './setup.py')
-shutil.copyfile('./winsync/lib/postinstall.py', './install.py')
-with open( 'README.txt', 'w' ) as f:
+link_or_copy(os.path.join(install_root, 'winsync', 'lib', 'setup.py'),
+             os.path.join(install_root, 'setup.py'))
+link_or_copy(os.path.join(install_root, 'winsync', 'lib', 'postinstall.py'),
+             os.path.join(install_root, 'install.py'))
+with open( os.path.join(install_root, 'README.txt'), 'w' ) as f:
     pass
 
-#Create zip based install file
-subprocess.check_call([python_exe, '-m', 'winsync.lib.setup', 'sdist'])
+def build_sdist():
+    """Create the zip based install file in-process."""
+    with setup_args(['sdist']):
+        setup_script.start_setup()
 
-#If the platform is windows, then create the exe installer
+#If the platform is windows, also create the exe installer. The two
+#builds write distinct archives, so they can overlap: the exe build
+#runs in a child interpreter while the sdist runs here. They cannot
+#share this process because distutils command state and sys.argv are
+#process-global.
 if sys.platform == 'win32':
-    subprocess.check_call([python_exe, '-m', 'winsync.lib.setup', 'bdist_wininst',
-                           '--install-script=install.py',
-                           '--user-access-control=force',
-                           '--target-version=3.2'])
-
-#Make sure the install files were built, then clean up
-if os.path.exists('build'):
-    shutil.rmtree('build')
-    os.remove('setup.py')
-    os.remove('install.py')
-
-#Move install files to their final location
-for file in os.listdir('dist'):
-    shutil.move(os.path.join('dist', file),
-                os.path.join(old_dir, file))
+    bdist_cmd = [sys.executable,
+                 os.path.join(install_root, 'setup.py'),
+                 'bdist_wininst',
+                 '--install-script=install.py',
+                 '--user-access-control=force',
+                 '--target-version=3.2']
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(build_sdist),
+                   pool.submit(subprocess.check_call, bdist_cmd,
+                               cwd=install_root)]
+
+        #result() re-raises anything a build raised
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+else:
+    build_sdist()
+
+#Make sure the install files were built, then clean up. Letting rmtree
+#raise for a missing build directory replaces the exists() stat probe;
+#when nothing was built the temporary scripts are left for inspection.
+try:
+    shutil.rmtree(os.path.join(install_root, 'build'))
+except FileNotFoundError:
+    pass
+else:
+    os.remove(os.path.join(install_root, 'setup.py'))
+    os.remove(os.path.join(install_root, 'install.py'))
+
+#Move install files to their final location. os.replace is a rename,
+#shutil.move is only needed when the destination is on another volume.
+dist_dir = os.path.join(install_root, 'dist')
+for file in os.listdir(dist_dir):
+    try:
+        os.replace(os.path.join(dist_dir, file),
+                   os.path.join(dest_dir, file))
+    except OSError:
+        shutil.move(os.path.join(dist_dir, file),
+                    os.path.join(dest_dir, file))
 
 #Finish clean up
-os.rmdir('dist')
-if os.path.exists('MANIFEST'):
-    os.remove('MANIFEST')
+os.rmdir(dist_dir)
+try:
+    os.remove(os.path.join(install_root, 'MANIFEST'))
+except FileNotFoundError:
+    pass
 
-os.remove('README.txt')
+os.remove(os.path.join(install_root, 'README.txt'))
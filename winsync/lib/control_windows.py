@@ -1,9 +1,81 @@
+import collections
 import ctypes as ct
 import ctypes.wintypes as wintypes
+import io
+import itertools
+import sys
+import threading
 import tkinter as tk
+import weakref
 
 user32 = ct.windll.user32
 
+#Declare the prototypes of the win32 functions we call once at import
+#time. Without argtypes/restype ctypes re-infers how to marshal every
+#argument on every call; a declared signature turns that into a fixed
+#conversion. The ctypes loader hands out one function object per name,
+#so these declarations also cover the other modules that share user32.
+user32.GetClassNameW.argtypes = [wintypes.HWND, wintypes.LPWSTR, ct.c_int]
+user32.GetClassNameW.restype = ct.c_int
+user32.GetWindowTextW.argtypes = [wintypes.HWND, wintypes.LPWSTR, ct.c_int]
+user32.GetWindowTextW.restype = ct.c_int
+user32.GetDlgCtrlID.argtypes = [wintypes.HWND]
+user32.GetDlgCtrlID.restype = ct.c_int
+
+#The LPVOID lParam accepts an int, None, a byref() or a ctypes buffer,
+#which covers every way these are called; wParam is always an integer
+user32.SendMessageW.argtypes = [wintypes.HWND, wintypes.UINT,
+                                wintypes.WPARAM, wintypes.LPVOID]
+user32.SendMessageW.restype = wintypes.LPARAM
+user32.SendMessageA.argtypes = [wintypes.HWND, wintypes.UINT,
+                                wintypes.WPARAM, wintypes.LPVOID]
+user32.SendMessageA.restype = wintypes.LPARAM
+user32.SendInput.argtypes = [wintypes.UINT, wintypes.LPVOID, ct.c_int]
+user32.SendInput.restype = wintypes.UINT
+
+user32.SetForegroundWindow.argtypes = [wintypes.HWND]
+user32.SetForegroundWindow.restype = wintypes.BOOL
+user32.SetFocus.argtypes = [wintypes.HWND]
+user32.SetFocus.restype = wintypes.HWND
+user32.SetWindowPos.argtypes = [wintypes.HWND, wintypes.HWND, ct.c_int,
+                                ct.c_int, ct.c_int, ct.c_int, wintypes.UINT]
+user32.SetWindowPos.restype = wintypes.BOOL
+user32.GetWindowLongW.argtypes = [wintypes.HWND, ct.c_int]
+user32.GetWindowLongW.restype = wintypes.LONG
+user32.SetWindowLongW.argtypes = [wintypes.HWND, ct.c_int, wintypes.LONG]
+user32.SetWindowLongW.restype = wintypes.LONG
+user32.RedrawWindow.argtypes = [wintypes.HWND, wintypes.LPVOID,
+                                wintypes.LPVOID, wintypes.UINT]
+user32.RedrawWindow.restype = wintypes.BOOL
+
+user32.IsWindowEnabled.argtypes = [wintypes.HWND]
+user32.IsWindowEnabled.restype = wintypes.BOOL
+user32.EnableWindow.argtypes = [wintypes.HWND, wintypes.BOOL]
+user32.EnableWindow.restype = wintypes.BOOL
+
+user32.GetCursorPos.argtypes = [wintypes.LPVOID]
+user32.GetCursorPos.restype = wintypes.BOOL
+user32.SetCursorPos.argtypes = [ct.c_int, ct.c_int]
+user32.SetCursorPos.restype = wintypes.BOOL
+
+user32.GetSystemMenu.argtypes = [wintypes.HWND, wintypes.BOOL]
+user32.GetSystemMenu.restype = wintypes.HMENU
+user32.DeleteMenu.argtypes = [wintypes.HMENU, wintypes.UINT, wintypes.UINT]
+user32.DeleteMenu.restype = wintypes.BOOL
+
+user32.FindWindowExW.argtypes = [wintypes.HWND, wintypes.HWND,
+                                 wintypes.LPCWSTR, wintypes.LPCWSTR]
+user32.FindWindowExW.restype = wintypes.HWND
+
+#The callback type handed to EnumChildWindows. Constructing a
+#WINFUNCTYPE generates a machine-code trampoline, so the prototype is
+#built once here rather than on every scan.
+ENUMCHILDPROC = ct.WINFUNCTYPE(ct.c_bool, wintypes.HWND, wintypes.LPARAM)
+
+user32.EnumChildWindows.argtypes = [wintypes.HWND, ENUMCHILDPROC,
+                                    wintypes.LPARAM]
+user32.EnumChildWindows.restype = wintypes.BOOL
+
 #These structures are used to simulate a mouse event, see Window.click().
 class MOUSEINPUT(ct.Structure):
     '''See: http://msdn.microsoft.com/en-us/library/windows/desktop/ms646273(v=vs.85).aspx'''
@@ -27,22 +99,38 @@ class INPUT_TYPE_UNION(ct.Union):
 
 class INPUT(ct.Structure):
     '''See: http://msdn.microsoft.com/en-us/library/windows/desktop/ms646270(v=vs.85).aspx'''
-    _anonymous = ['_0']
+    _anonymous_ = ['_0']
     _fields_ = [
         ('type', wintypes.DWORD),
         ('_0', INPUT_TYPE_UNION),
     ]
 
+#A single reusable pair of input records for Window.click(): left
+#button down followed by left button up. Only the coordinates differ
+#between clicks, so everything else is filled in once here. Leaving the
+#time fields at zero has the system stamp each event itself.
+_click_inputs = (INPUT * 2)()
+_click_inputs[0].mi.dwFlags = 0x8000 | 0x0002
+_click_inputs[1].mi.dwFlags = 0x8000 | 0x0004
+
 #Constants used by buttons to broadcast a windows click event
 WM_LBUTTONDOWN = 0x0201
 WM_LBUTTONUP = 0x0202
+
+#Strips the & mnemonic marker out of control text in one C-level pass,
+#see Control.__init__
+_AMP_TABLE = str.maketrans('', '', '&')
     
-#This list is used to generate a "recording" of the actions to taken by the
-#user. Initially, the necessary import and play function is created.
-recording = ['''
+#This buffer is used to generate a "recording" of the actions to taken by the
+#user. Initially, the necessary import and play function is created. A
+#StringIO appends each action line in C, without keeping a Python list
+#slot alive per action for the life of the session.
+recording = io.StringIO()
+recording.write('''
 def play():
     import winsync.lib.playback as play
-''']
+
+''')
 
 #This variable specifies whether the library is in record or playback mode
 playback = False
@@ -51,6 +139,26 @@ playback = False
 #unnecessarily in the play back script
 variables = {}
 
+#Reverse map from a control's identity to its variable name, and the
+#next suffix number for each class. Together they make registering a
+#control a pair of dictionary operations instead of a scan over every
+#known variable.
+_var_names = {}
+_class_counters = collections.defaultdict(int)
+
+def _var_key(control):
+    """Return the hashable identity make_var_name files a control under.
+    Controls are identified by the same fields their __eq__ compares, so
+    a re-scan of a window hands back the names it assigned last time.
+    Windows compare by object identity.
+    """
+    if isinstance(control, Control):
+        return (control.__class__, control.parent.hwnd,
+                control.resource_id, control.class_name,
+                control.hwnd, control.actual_text)
+
+    return id(control)
+
 def get_logger(suffix):
     """This function returns a logger object with a useful context. The suffix
     parameter should be the either a class name or a function name. If the
@@ -75,31 +183,23 @@ def make_var_name(control):
     slightly more readable/editable.
     """
     global variables
-    
-    #Variable names have a number suffix. This specifies that number.
-    i = 1
-    
 
-    template = None
+    #If the object already has a variable name, return it
+    key = _var_key(control)
+    name = _var_names.get(key)
+    if name is not None:
+        return name
 
-    #Set the variable's prefix or if the object already has a variable name,
-    #return it    
-    if control in variables.values():
-        vlist = list(variables.values())
-        return vlist[vlist.index(control)].name
-    else:
-        template = '{}_{{}}'.format(control.__class__.__name__.lower())
-    
-    #Cycle through all possible suffix numbers until an unused number
-    #is found.
-    name = template.format(i)
-    while name in variables:
-        name = template.format(i)
-        i += 1
+    #Variable names have a number suffix. One counter per class keeps
+    #the names unique without probing the variables dictionary.
+    prefix = control.__class__.__name__.lower()
+    _class_counters[prefix] += 1
+    name = '{}_{}'.format(prefix, _class_counters[prefix])
 
     #Register this variable so it will not be recreated.
     variables[name] = control
-    
+    _var_names[key] = name
+
     #Return the unique variable name
     return name
 
@@ -138,22 +238,145 @@ def start_exe(exe):
         logger.info('Starting executable using: {}'.format(exe))
 
     process = subprocess.Popen(exe)
-    
-    recording.append('\tplay.start_exe("{}")'.format(original_exe))
-    
+
+    recording.write('\tplay.start_exe("{}")\n'.format(original_exe))
+
     return process
-    
+
+#The one popup menu every control and window shares. Rebuilding its few
+#entries when it opens is cheap; keeping a Tcl-side menu object per
+#control is not.
+_popup = None
+
+def _show_popup(owner, event):
+    """Show the shared popup menu for the given window or control. The
+    menu's entries are rebuilt from the owner's menu_items each time it
+    opens.
+    """
+    global _popup
+
+    if _popup is None:
+        _popup = tk.Menu(owner.parent_window, tearoff=0)
+
+    _popup.delete(0, 'end')
+
+    #The menu tables hold method names, the bound methods are only
+    #looked up here when the menu actually opens
+    for label, method_name in owner._MENU_ITEMS:
+        _popup.add_command(label=label, command=getattr(owner, method_name))
+
+    try:
+        _popup.tk_popup(event.x_root, event.y_root)
+    finally:
+        _popup.grab_release()
+
+#Scannable windows keyed by a small integer cookie. The cookie rides
+#through EnumChildWindows' lparam, so the shared callback recovers the
+#window being scanned from its own arguments rather than from module
+#state, and nested or interleaved scans cannot trample each other. The
+#references are weak so the registry does not keep dead windows alive.
+_windows = weakref.WeakValueDictionary()
+_window_cookies = itertools.count(1)
+
+#Per-thread scratch buffers for the enumeration callbacks, so a scan
+#does not allocate two fresh 255 character buffers per child window
+_scratch = threading.local()
+
+def _scratch_buffers():
+    """Return this thread's pair of scratch unicode buffers, creating
+    them on first use.
+    """
+    buffers = getattr(_scratch, 'buffers', None)
+    if buffers is None:
+        buffers = (ct.create_unicode_buffer(256),
+                   ct.create_unicode_buffer(256))
+        _scratch.buffers = buffers
+
+    return buffers
+
+def _winchild_callback(hwnd, lparam):
+    """This function handles the enumeration process used by the Windows
+    API, see Window.scan_controls.
+    """
+    self = _windows[lparam]
+
+    #The buffers are reused between children, clearing the first
+    #character keeps a failed call from leaking the previous child's
+    #value
+    (classname, text) = _scratch_buffers()
+    classname[0] = '\x00'
+    text[0] = '\x00'
+
+    #Get the control's class name
+    user32.GetClassNameW(hwnd, classname, 255)
+
+    #Get the text of the control
+    user32.GetWindowTextW(hwnd, text, 255)
+
+    resource_id = user32.GetDlgCtrlID(hwnd)
+
+    #If the child window is a type we can control then
+    #create a component object to represent it
+    control = self.get_control(resource_id, classname.value,
+                               text.value, hwnd)
+    if control is not None:
+        #Reuse the wrapper from the previous scan when one matches
+        old = self._old_by_key.get(_var_key(control))
+        if old is not None:
+            self.controls.append(old)
+        else:
+            self.controls.append(control)
+
+    #There is no recursive call here for grandchildren: EnumChildWindows
+    #on the top-level window already walks every descendant itself, so
+    #re-entering the enumeration per node visited whole subtrees again
+    #through the callback trampoline.
+
+    return True
+
+#The one callback instance every scan shares. Wrapping the function
+#allocates a trampoline, so it happens once at import.
+_enumchildproc = ENUMCHILDPROC(_winchild_callback)
+
+#Scratch list the fingerprint callback below fills in, see
+#Window.scan_controls
+_fingerprint_items = []
+
+def _fingerprint_callback(hwnd, lparam):
+    """This callback records each child's handle and text so a scan can
+    tell whether anything changed since the last one.
+    """
+    text = _scratch_buffers()[1]
+    text[0] = '\x00'
+    user32.GetWindowTextW(hwnd, text, 255)
+
+    _fingerprint_items.append((hwnd, text.value))
+
+    return True
+
+_fingerprintproc = ENUMCHILDPROC(_fingerprint_callback)
+
 class Window:
     """This class represents a window shown by the Windows operating system.
     It is mostly used to find and manipulate the controls found within this
     window.
     """
     label_template = 'Window Title:\n{c.text}'
-    
+
+    #The entries of the popup menu, shared by every instance. The
+    #method named in each entry is bound when the menu opens.
+    _MENU_ITEMS = (('Click At', 'click'),
+                   ('Close Window', 'close'))
+
     def __init__(self, class_name, text, hwnd, app=None):
         self.hwnd = hwnd
         self.app = app
-        
+
+        #Register this window so the enumeration callback can find it
+        #through the lparam cookie, see scan_controls
+        self._scan_cookie = next(_window_cookies)
+        _windows[self._scan_cookie] = self
+
         if isinstance(class_name, str):
             self.class_name = class_name
         else:
@@ -172,10 +395,10 @@ class Window:
         
         #This will be the master list of controls for the window
         self.controls = []
-        
-        self.menu_items = [('Click At', self.click),
-                           ('Close Window', self.close)]
-        
+
+        #The child fingerprint of the last scan, see scan_controls
+        self._fingerprint = None
+
         self.scan_controls()
         
     def prep_window(self):
@@ -206,47 +429,35 @@ class Window:
     def scan_controls(self):
         '''This callback will scan the window for child windows that can be controled.'''
 
-        #This function handled the enumeration process used by the Windows API.
-        def winchild_callback(hwnd, lpparm):
-            #Get the control's class name
-            classname = ct.create_unicode_buffer('', 255)
-            user32.GetClassNameW(hwnd, classname, 255)
-            
-            #Get the text of the control
-            text = ct.create_unicode_buffer('', 255)
-            user32.GetWindowTextW(hwnd, text, 255)
-            
-            resource_id = user32.GetDlgCtrlID(hwnd)
-                       
-            #If the child window is a type we can control then
-            #create a component object to represent it 
-            control = self.get_control(resource_id, classname.value,
-                                       text.value, hwnd)
-            if control is not None:
-                try:
-                    old = self.old_controls.index(control)
-                    self.controls.append(self.old_controls[old])
-                except ValueError:
-                    self.controls.append(control)
-                    
-            #Recurse to gobble up any grandchildren
-            user32.EnumChildWindows(hwnd, enumchildproc, None)
-            
-            return True
-                    
-        #Keep the old controls so we can detect repeats
-        self.old_controls = self.controls
-        
+        #First take a cheap fingerprint of the child windows: just their
+        #handles and text. If it matches the previous scan nothing has
+        #changed, so the existing control list is still good and the
+        #whole rebuild below is skipped. find_control polls this method
+        #once a second, and most polls find the window unchanged.
+        del _fingerprint_items[:]
+        user32.EnumChildWindows(self.hwnd, _fingerprintproc, 0)
+        fingerprint = hash(tuple(_fingerprint_items))
+
+        if self.controls and fingerprint == self._fingerprint:
+            return
+
+        self._fingerprint = fingerprint
+
+        #Key the old controls so we can detect repeats with a dictionary
+        #lookup instead of a linear search per child
+        self._old_by_key = {_var_key(c): c for c in self.controls}
+
         #Clear the list for the new control list
         self.controls = []
-        
-        #Have Windows enumerate all of the child windows for our window
-        enumchildproc_type = ct.WINFUNCTYPE(ct.c_bool, ct.c_int, ct.c_void_p)
-        enumchildproc = enumchildproc_type(winchild_callback)
-        
-        user32.EnumChildWindows(self.hwnd, enumchildproc, None)
-        
-        del(self.old_controls)
+
+        #Have Windows enumerate all of the child windows for our window.
+        #The callback and its trampoline live at module scope, so a scan
+        #no longer generates a fresh WINFUNCTYPE thunk and closure. The
+        #cookie tells the callback which window this scan belongs to.
+        user32.EnumChildWindows(self.hwnd, _enumchildproc,
+                                self._scan_cookie)
+
+        del(self._old_by_key)
         
     def get_control(self, resource_id, classname, text, hwnd):
         """This method returns an object that is a subclass of control.Control
@@ -277,26 +488,18 @@ class Window:
                               takefocus=1, foreground='white',
                               background='darkblue')
         self.label.pack(expand=tk.YES, fill=tk.X)
-        
-        self.popup = tk.Menu(tkwindow, tearoff=0)
-        for label, command in self.menu_items:
-            self.popup.add_command(label=label,
-                                   command=command)
-        
+
         self.label.bind('<Button-1>', self.do_popup)
         self.frame.bind('<Button-1>', self.do_popup)
 
         self.frame.pack(expand=tk.YES, fill=tk.X)
-        
+
         return self.frame
-    
+
     def do_popup(self, event):
         '''This callback shows the pop window in the GUI.'''
-        try:
-            self.popup.tk_popup(event.x_root, event.y_root)
-        finally:
-            self.popup.grab_release()
-            
+        _show_popup(self, event)
+
     def click(self, x=None, y=None, wait=0.5):
         '''When the user selects "Click At" this callback is executed. This
         function will insert two messages into Windows' input stream. Namely,
@@ -323,8 +526,7 @@ class Window:
         '''
         import ctypes.wintypes as wintypes
         import time
-        import copy
-        
+
         point = wintypes.POINT()
         
         if not playback:
@@ -354,27 +556,16 @@ class Window:
         #Simulating events in Windows is now quite complicated,
         #they deprecated all of the easy ways. Basically we have
         #to fill out a complicated structure and place it in a
-        #two item array. 90% of the code below is just to fill
-        #in the structures.
-        mouse = INPUT * 2
-        
-        #Press the left mouse button down
-        itu = INPUT_TYPE_UNION()
-        mills = int(time.time() * 1000)
-        itu.mi = MOUSEINPUT(point.x, point.y, 0, 0x8000 | 0x0002, mills, 0)
-        
-        #Release the left mouse button 1 millisecond later
-        itu2 = INPUT_TYPE_UNION()
-        itu2.mi = MOUSEINPUT(point.x, point.y, 0, 0x8000 | 0x0004, itu.mi.time + 1, 0)
-        
-        #Create the array containing our click event
-        x = mouse((0,itu), (0,itu2))
-        
+        #two item array. The array is shared and prefilled at module
+        #scope, only the click coordinates change from call to call.
+        _click_inputs[0].mi.dx = _click_inputs[1].mi.dx = point.x
+        _click_inputs[0].mi.dy = _click_inputs[1].mi.dy = point.y
+
         if playback:
-            logger.debug('Clicking window "{}" at ({},{})'.format(self.text, x, y))
-        
+            logger.debug('Clicking window "{}" at ({},{})'.format(self.text, point.x, point.y))
+
         #Broadcast the click event
-        user32.SendInput(2, ct.byref(x), ct.sizeof(x[0]))
+        user32.SendInput(2, ct.byref(_click_inputs), ct.sizeof(INPUT))
         
         self.record('\t{{name}}.click({}, {})'.format(point.x, point.y))
     def close(self):
@@ -389,42 +580,49 @@ class Window:
         
     def record(self, template):
         global recording
-        
-        if not playback:
-            recording.append(template.format(**self.__dict__))
+
+        if playback:
+            return
+
+        #format_map reads the fields straight out of __dict__ instead of
+        #unpacking it into a fresh keyword dictionary per action
+        recording.write(template.format_map(self.__dict__) + '\n')
 
 class Control:
     label_template = 'Class: {c.class_name}\nText: {c.text}'
-    menu_items = []
-    
+
+    #The entries of the popup menu, shared by every instance of the
+    #class. Subclasses extend this tuple rather than building a fresh
+    #list of bound methods per control; the method named in each entry
+    #is bound when the menu opens.
+    _MENU_ITEMS = (('Enable/Disable', 'toggle_state'),
+                   ('Set Text', 'set_text'))
+
     def __init__(self, parent, resource_id, class_name, text, hwnd):
         self.parent = parent
         self.resource_id = resource_id
         self.hwnd = hwnd
         
+        #Intern the strings that find_control compares against every
+        #poll, so the usual case of a match is a pointer comparison
         if isinstance(class_name, str):
-            self.class_name = class_name
+            self.class_name = sys.intern(class_name)
         else:
-            self.class_name = class_name.value
-        
+            self.class_name = sys.intern(class_name.value)
+
         if isinstance(text,str):
-            self.actual_text = text
+            self.actual_text = sys.intern(text)
         else:
-            self.actual_text = text.value
-        
+            self.actual_text = sys.intern(text.value)
+
         self.name = make_var_name(self)
         self.instantiated = False
         
         #In windows the & corresponds to what letter can be pressed after ALT
-        #to identify the control. leaving it makes displaying the text 
+        #to identify the control. leaving it makes displaying the text
         #awkward. So remove it.
-        self.text = text.replace('&','')
-        
-        #This is a list of items to be shown in the pop window, subclasses
-        #will either add to or override these default options
-        self.menu_items = [('Enable/Disable', self.toggle_state),
-                           ('Set Text', self.set_text)]
-      
+        self.text = text.translate(_AMP_TABLE)
+
     def __eq__(self, other):
         if isinstance(other, type(self))            and \
            self.parent.hwnd == other.parent.hwnd    and \
@@ -443,12 +641,14 @@ class Control:
             return
         
         if not self.instantiated:
-            recording.append('\t{name} = play.find_control({parent.name}, '
-                             '{resource_id}, "{class_name}", '
-                             '"{actual_text}")'.format(**self.__dict__))
+            recording.write('\t{name} = play.find_control({parent.name}, '
+                            '{resource_id}, "{class_name}", '
+                            '"{actual_text}")\n'.format_map(self.__dict__))
             self.instantiated = True
-        
-        recording.append(template.format(**self.__dict__))
+
+        #format_map reads the fields straight out of __dict__ instead of
+        #unpacking it into a fresh keyword dictionary per action
+        recording.write(template.format_map(self.__dict__) + '\n')
 
     def make_button(self, window, *args, **kwargs):
         label = self.label_template.format(c=self)
@@ -459,25 +659,17 @@ class Control:
         self.label = tk.Label(self.frame, text=label, anchor=tk.W,
                               justify=tk.LEFT, takefocus=1, *args, **kwargs)
         self.label.pack(expand=tk.YES, fill=tk.X)
-        
-        self.popup = tk.Menu(window, tearoff=0)
-        for label, command in self.menu_items:
-            self.popup.add_command(label=label,
-                                   command=command)
-        
+
         self.label.bind('<Button-1>', self.do_popup)
         self.frame.bind('<Button-1>', self.do_popup)
 
         self.frame.pack(expand=tk.YES, fill=tk.X)
-        
+
         return self.frame
-    
+
     def do_popup(self, event):
-        try:
-            self.popup.tk_popup(event.x_root, event.y_root)
-        finally:
-            self.popup.grab_release()
-            
+        _show_popup(self, event)
+
     def toggle_state(self):
         toggle_to = not user32.IsWindowEnabled(self.hwnd)
         
@@ -507,7 +699,7 @@ class Control:
                 logger.debug('Changing the "{}" control\'s text to "{}"'.format(self.text, new_text))
             
             new_text = ct.create_unicode_buffer(new_text)
-            if not user32.SendMessageW(self.hwnd, 0x000C, None,
+            if not user32.SendMessageW(self.hwnd, 0x000C, 0,
                                        new_text):
                 raise ct.WinError()
             
@@ -516,7 +708,7 @@ class Control:
                 raise ct.WinError()
             
             self.actual_text = new_text.value
-            self.text = new_text.value.replace('&','')
+            self.text = new_text.value.translate(_AMP_TABLE)
             
             self.record('\t{name}.set_text({actual_text})')
             
@@ -527,13 +719,9 @@ class Control:
         return user32.SetFocus(self.hwnd)
   
 class Button(Control):
-    def __init__(self, parent, resource_id, class_name, text, hwnd):
-        Control.__init__(self, parent, resource_id, class_name, 
-                         text, hwnd)
-        
-        #The only added command for a button is to click it.
-        self.menu_items.append(('Click Button', self.click))
-        
+    #The only added command for a button is to click it.
+    _MENU_ITEMS = Control._MENU_ITEMS + (('Click Button', 'click'),)
+
     def click(self, wait=0.5):
         import time
         
@@ -8,50 +8,49 @@ trans_table = str.maketrans({'$':None})
 #This is the character pool that gen_salt draws from.
 #It contains all printable characters except white 
 #space characters and the '$' character.
-salt_pool = ''.join([string.digits, string.ascii_letters, 
+salt_pool = ''.join([string.digits, string.ascii_letters,
                      string.punctuation.translate(trans_table)])
 
+#This is the pool gen_machine_password draws from. & and = are also
+#removed because they can appear in URL query strings. Built once here
+#instead of rebuilding the translation table on every call.
+pass_pool = salt_pool.translate(str.maketrans({'&':None, '=':None}))
+
+def _sample_pool(pool, size):
+    """Return a string of the given size randomly drawn from the pool.
+    All of the randomness comes from a single urandom call instead of
+    one kernel round-trip per character. Two bytes are drawn per
+    character, which keeps the selection bias negligible for a pool of
+    fewer than a hundred characters.
+    """
+    import os
+
+    values = memoryview(os.urandom(size * 2)).cast('H')
+
+    #Map the random values onto the pool, then join them together
+    n = len(pool)
+    return ''.join([pool[v % n] for v in values])
+
 def gen_salt(size=64):
     """This function generates a new salt string and returns it. Uses a
     random selection of printable characters excluding whitspace
     characters and '$'. The size parameter will specify how large to
     make the resulting string.
     """
-    import random
     global salt_pool
-    
-    try:
-        #More cryptographic random number generator.
-        rand = random.SystemRandom()
-    except:
-        #SystemRandom is not implemented on all systems, so use the default
-        rand = random.random()
-
-    #Create an array of random values from the pool, then joint them together
-    #to create the salt.
-    return ''.join([rand.choice(salt_pool) for i in range(0, size)])
+
+    return _sample_pool(salt_pool, size)
 
 def gen_machine_password(length=128):
     """This function generates a random password of the given length suitable
     for a client machine to use.
     """
-    import random
-    global salt_pool
-    
-    try:
-        #More cryptographicly secure random number generator.
-        rand = random.SystemRandom()
-    except:
-        #SystemRandom is not implemented on all systems, so use the default
-        rand = random.random()
-        
-    # & and = are removed because they can appear in URL query strings
-    trans_table = str.maketrans({'&':None, '=':None})
-    pass_pool = salt_pool.translate(trans_table)
-
+    global pass_pool
 
-    #Create the password
-    return ''.join([rand.choice(pass_pool) for i in range(0, length)])
+    #Create the password from the same bulk urandom draw gen_salt uses.
+    #Going through os.urandom directly drops the SystemRandom layer,
+    #which paid a kernel round-trip per character.
+    return _sample_pool(pass_pool, length)
 
 
 def calculate_key(salt, password):
@@ -59,68 +58,88 @@ def calculate_key(salt, password):
     salt. It uses the sha512 algorithm. The string will be 128 hexidecimal
     digits.
     """
-    def alternate(a, b):
-        """This generator intermingle iterable a and b.
-        Basically it yields: a[0], b[0], a[1], b[1], etc.
-        """
-        import itertools
-        
-        a_iter = itertools.cycle(a)
-        b_iter = itertools.cycle(b)
-        
-        for x in itertools.cycle((a_iter, b_iter)):
-            yield next(x)
-            
+    import itertools
+
     crypt = hashlib.sha512()
-    flip = alternate(salt, password)
-    
-    for i in range(100000):
-        crypt.update(next(flip).encode('utf-8'))
+
+    #Build the 100,000 character stream of alternating salt and password
+    #characters up front and hash it with a single update call. This
+    #feeds the hash the exact same byte stream as updating one character
+    #at a time, so existing stored keys still verify, but the digest
+    #loop runs inside the C library instead of making 100,000 Python
+    #calls with an encode each.
+    chars = [None] * 100000
+    chars[0::2] = itertools.islice(itertools.cycle(salt), 50000)
+    chars[1::2] = itertools.islice(itertools.cycle(password), 50000)
+
+    crypt.update(''.join(chars).encode('utf-8'))
 
     return crypt.hexdigest()
 
+def calculate_key_v2(salt, password):
+    """This function generates a string containing the password and salt
+    using PBKDF2 with sha512 and 100,000 rounds. The entire stretch runs
+    inside the hash library. The string will be 128 hexidecimal digits.
+    This is the algorithm behind version 2 key files, see write_key.
+    """
+    return hashlib.pbkdf2_hmac('sha512', password.encode('utf-8'),
+                               salt.encode('utf-8'), 100000).hex()
+
 def write_key(out_file, salt, key):
-    """Write a key to the given file with the format: salt$key. Note,
-    this method is semetric with read_key.
+    """Write a key to the given file with the format: v2$salt$key. The
+    leading marker records that the key was made by calculate_key_v2.
+    Note, this method is semetric with read_key.
     """
-    
+
     #Note the salt is gaurenteed not to contain a $ so we will use that
     #as a separator
-    record = "{salt}${key}".format(salt=salt, key=key)
+    record = "v2${salt}${key}".format(salt=salt, key=key)
 
     with open(out_file, 'w', encoding='utf-8') as f:
         f.write(record)
 
 def read_key(in_file):
     """Read a key from the given file returning a tuple with the format
-    (salt, key). Note, this method is semetric with write_key.
+    (version, salt, key). Files written before the version marker was
+    introduced hold just salt$key and are reported as version 1.
+    Note, this method is semetric with write_key.
     """
     with open(in_file, 'r', encoding='utf-8') as f:
         record = f.read()
 
-    #Return the tuple (salt, key) using the first $ as the separator
-    return record.split('$', 1)
+    if record.startswith('v2$'):
+        (version, salt, key) = record.split('$', 2)
+        return (2, salt, key)
+
+    #A version 1 record, split into (salt, key) on the first $
+    (salt, key) = record.split('$', 1)
+    return (1, salt, key)
 
 def password_valid(password, key_file):
     """Return whether the given plain text password and what is stored
     in the key_file, match. In other words, return True if the given password
     matches the stored key. This function uses the read_key function, so be
-    sure the file has the proper format.
+    sure the file has the proper format. Keys are checked with the
+    algorithm their file records, so old and new key files both work.
     """
-    (salt, key_from_file) = read_key(key_file)
+    (version, salt, key_from_file) = read_key(key_file)
 
-    password_key = calculate_key(salt, password)
+    if version == 2:
+        password_key = calculate_key_v2(salt, password)
+    else:
+        password_key = calculate_key(salt, password)
 
     return password_key == key_from_file
 
 def write_password(key_file, password, salt=None):
     """This function is a short-cut taking a plain text password and writing it
     to the given key file using the given salt. If the salt parameter is None
-    then a new salt will be generated.
+    then a new salt will be generated. New key files always use the
+    version 2 algorithm.
     """
     if salt is None:
         salt = gen_salt()
 
-    key = calculate_key(salt, password)
+    key = calculate_key_v2(salt, password)
 
     write_key(key_file, salt, key)
@@ -3,6 +3,15 @@ import ctypes as ct
 
 control.playback = True
 
+#Recording is dead weight during playback. Swapping the record methods
+#for a no-op means every action skips the whole method body instead of
+#re-testing the playback flag inside it.
+def _record_noop(self, template):
+    return
+
+control.Window.record = _record_noop
+control.Control.record = _record_noop
+
 user32 = ct.windll.user32
 
 def find_window(class_name, title, wait_time=3600):
@@ -36,8 +45,10 @@ def find_window(class_name, title, wait_time=3600):
         #Try locating the window
         hwnd = user32.FindWindowExW(None, None, name_buffer, text_buffer)
         
-        #An HWND handle means we found the window
-        if hwnd != 0:
+        #An HWND handle means we found the window. With FindWindowExW's
+        #restype declared as HWND a null handle comes back as None, so
+        #test for truth rather than comparing against zero.
+        if hwnd:
             return control.Window(class_name, title, hwnd)
 
         #Did not find the window so wait 1/2 second and try again
@@ -66,8 +77,15 @@ def find_control(parent, resource_id, class_name, text, wait_time=18000):
     FindWindowEx() function in the win32 API can fail. The problem with this
     way of finding a control is that it can be time consuming.
     """
+    import sys
     import time
-    
+
+    #Control interns its class name and text, interning the search
+    #strings too makes each comparison below a pointer check when the
+    #strings match
+    text = sys.intern(text)
+    class_name = sys.intern(class_name)
+
     #Get the time 1 hour from now
     time_out = time.time() + wait_time
     
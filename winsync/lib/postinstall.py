@@ -5,8 +5,11 @@ import re
 import shutil
 import winsync.lib.util as util
 
-#Get the start menu's location
+#Get the start menu's and desktop's locations. Each lookup is a Win32
+#SHGetFolderPath round-trip, so both are resolved once here and shared
+#by the install and remove branches.
 start_menu = util.get_special_folder('COMMON_STARTMENU')
+desktop_folder = util.get_special_folder('DESKTOP')
 
 #This is where the program's shorcuts will be installed
 program_folder = os.path.join(start_menu, 'Programs', 'Winsync')
@@ -18,26 +21,27 @@ shortcut_filepath = [
     os.path.join(program_folder, 'Record Interactions.lnk')]
 
 if sys.argv[1] == '-install':
-    
-    desktop_folder = util.get_special_folder('DESKTOP')
-    
+
     #Look for C:\Python3#\python.exe in sys.path
-    found = False
     python_exe = ''
     python_path = re.compile('^([A-Za-z]:\\\\Python3[0-9]).*$')
     for path in sys.path:
+        #Most sys.path entries (stdlib, site-packages) cannot possibly
+        #match, so a cheap string test weeds them out before paying for
+        #the regex engine.
+        if path[1:3] != ':\\' or path[3:10].lower() != 'python3':
+            continue
+
         m = python_path.match(path)
         if m:
             new_python_exe = os.path.join(m.group(1), 'python.exe')
             if os.path.exists(new_python_exe):
-                found = True
-                
                 #Only install the shortcuts for the newest python version
                 if new_python_exe > python_exe:
                     python_exe = new_python_exe
-    
+
     #No python.exe found, cannot continue
-    if not found:
+    if not python_exe:
         raise Exception('Could not find a valid python.exe from sys.path.')
     
     #When reinstalling, the program folder may already exist
@@ -68,14 +72,12 @@ elif sys.argv[1] == '-remove':
     if os.path.exists(program_folder):
         shutil.rmtree(program_folder)
         
-    #Remove the desktop shortcuts, start by changing the
-    #directory to the Desktop
-    os.chdir(util.get_special_folder('DESKTOP'))    
-    
-    for shortcut in shortcut_filepath:
-        #Get just the file name from the path
-        shortcut = os.path.basename(shortcut)
-        
-        #Remove the shortcut if it exists
-        if os.path.exists(shortcut):
-            os.remove(shortcut)
\ No newline at end of file
+    #Remove the desktop shortcuts. One scandir pass over the desktop
+    #finds which of them are present, so only files that actually exist
+    #are unlinked no matter how many shortcuts are on the list.
+    want = {os.path.basename(p) for p in shortcut_filepath}
+    with os.scandir(desktop_folder) as it:
+        targets = [entry.path for entry in it if entry.name in want]
+
+    for target in targets:
+        os.remove(target)
\ No newline at end of file
@@ -9,9 +9,13 @@ winsync_dir = winsync.__path__[0]
 
 def listdir(dir):
         global winsync_dir
-        for x in os.listdir(os.path.join(winsync_dir, dir)):
-            if not x.endswith('.pyc') and '__pycache__' not in x:
-                yield os.path.join(dir, x)
+        #scandir streams the directory instead of materializing a list,
+        #and its entries carry their names without an extra stat each
+        with os.scandir(os.path.join(winsync_dir, dir)) as it:
+            for entry in it:
+                if entry.name.endswith('.pyc') or entry.name == '__pycache__':
+                    continue
+                yield os.path.join(dir, entry.name)
 
 def start_setup():
     #This module is Python3 only
@@ -1,923 +1,1326 @@
-"""
-This module hosts many functions and objects needed to create installation
-scripts. This is one of the most important modules in the entire
-:mod:`winsync` library. The types of objects and functions hosted within
-this module are quite diverse, so users need import as few modules as possible.
-
-The preferred way to import this module is like this::
-
-      import winsync.lib.util as util
-
-Importing the module in this manner allow you to refer to it using only the
-``util`` prefix.
-"""
-
-import winsync.lib.config as config
-
-class WinsyncException(Exception):
-    pass
-
-class Installer:
-    """This is the Installer prototype class. All individual installation
-    scripts must contain a subclass of this class.
-    
-    The two most important methods are the install and check method. These two
-    method form the backbone of any installation script. They are the only
-    two methods you **must** override.
-    
-    Instances of this class have access to several convenient attributes. They
-    are designed to help make the life of installation script writers easier.
-    
-    * The ``logger`` attribute allow you access to the clients logging \
-    functionality. This attribute is an instance of the \
-    :class:`logging.Logger` class. You can use it to easily add your own log \
-    entries to the installation log file. You use it like this::
-        
-        def install(self):
-            #Perform your installation here ...
-            
-            self.logger.info( 'Finished the installation.' )
-            return True
-            
-    * The ``files_dir`` attribute points to where the installation files for \
-    your system have been downloaded. For example, say you simply have to \
-    silently run a file called install.exe, you could do it like this::
-    
-        def install(self):
-            exe = os.path.join( self.files_dir, 'install.exe' )
-            subprocess.check_call( [exe, '/S'] )
-            return True
-    
-    * You have direct access to the data stored in the package information \
-    file through the ``package`` attribute. This attribute an instance of the \
-    :class:`winsync.lib.PackageInfo` class.
-    
-    """
-    def __init__( self ):
-        import logging
-
-        logging.basicConfig( level=logging.DEBUG )
-        self.logger = logging
-        self.fake_download = True
-        self.files_dir = None
-        
-    def check( self ):
-        """This function checks to see if a package is installed. It should
-        return True if the package is installed, and False otherwise. This
-        function must be overloaded, otherwise the install method will always
-        be seen to fail.
-        """
-        return False
-    def install( self ):
-        """This method installs the package. It should return True if it
-        believes that the install went successfully. The main program will
-        still call the :meth:`check` method afterward to make sure. This
-        method **must be defined**.
-        """
-        return False
-    def upgrade( self ):
-        """This method performs an upgrade from the current state. By default,
-        it simply calls the install method. But you can override it if you need
-        to do something special.
-        """
-        return self.install()
-    def remove( self ):
-        """This method removes the package from the system. By default it 
-        simply returns True, and does nothing else. Essentially this will
-        tell the :mod:`winsync` to stop managing the package and remove it
-        from its cache, in general this is not the desired behavior. If you
-        want to actually remove the package's files from the system then
-        you should override this method.
-        """
-        return True
-
-
-    def _set_info( self, package, logger=None, fake_download=False ):
-        """Sets the package info from the ini file and logger attribute for
-        this object. That way users can access detailed information about the
-        program directly within the object. Do not override this method.
-        """
-        from winsync.lib.PackageInfo import PackageInfo
-        import os, os.path
-        
-        self.fake_download = fake_download
-
-        #If the user passes in a PackageInfo instance then set it,
-        #Otherwise treat it as a string and load the info file
-        if isinstance(package, PackageInfo ):
-            self.package = package
-        else:
-            self.package = PackageInfo( package, skip_dependents=True, 
-                                        skip_download=True )
-        
-        self.files_dir = os.path.join( config.spool_dir, self.package.id )
-        self.package.files_dir = self.files_dir
-        
-        if not os.path.exists( self.files_dir ):
-            os.mkdir( self.files_dir )
-        
-        if logger is not None:
-            self.logger = logger
-            
-    def _cleanup( self ):
-        """This method will delete the files_dir created in set_info()."""
-        import shutil, os, os.path
-        
-        shutil.rmtree( self.files_dir )
-        
-        if os.path.exists( self.files_dir ):
-            os.rmdir( self.files_dir )
-            if os.path.exists( self.files_dir ):
-                os.remove( self.files_dir )
-        
-    def _download_from_repo( self ):
-        """The purpose of this method is to simplify the downloading of the
-        package files from the repository. This method will divine the correct
-        URL for the file, it will then return the downloaded file's path.
-        """
-        import winsync.lib.rget as rget
-        
-        if self.fake_download:
-            return self.files_dir
-
-        return rget.download_archive( self.package )
-
-def test_installer( installer, package_name, 
-                    test=['install', 'check', 'remove', 'check'],
-                    get_pkg_info=True, download=True ):
-    """This is a convenience function used to test all aspects of an 
-    :class:`Installer` object. It can test the :meth:`Installer.install`,
-    :meth:`Installer.check`, :meth:`Installer.upgrade`, and
-    :meth:`Installer.remove` methods. This function will download the package
-    information file before beginning the tests. So make sure that the
-    repository is aware of your package's existence. It will
-    *not download the install script* since that is what we are testing.
-    
-    Usually you would only want this function to be executed when the script is
-    run on its own. So semantically you use it like this::
-    
-        import winsync.lib.util as util
-
-        class Firefox(util.Installer):
-            def check(self):
-                return util.uninstall_exists( 'Firefox.*' )
-            def install(self):
-                pass #TODO: install code
-            def remove(self):
-                pass #TODO: uninstall code
-
-        if __name__ == '__main__':
-            util.test_installer( Firefox(), 'firefox', test=['check'] )
-
-    This function does not return anything. It will output a log of the
-    activities to the screen. If the install or upgrade methods returns False
-    or have an exception raised, this function will simply return.
-    
-    :param installer: This is an instance of the :class:`Installer` class \
-    you want to test.
-    :param package_name: This is the unique package identifier that the \
-    function can use to access the correct package information file.
-    :param test: This parameter is very important. It sets what functions are \
-    tested and in what order. The test parameter must be a list of strings. \
-    Each string must be either: install, check, upgrade, or remove. This \
-    allows you the flexibility to test the methods in any order. For example, \
-    after you finish working on the remove method, you may want to skip \
-    testing the install and check methods. By default, the upgrade method is \
-    skipped.    
-    :param get_pkg_info: If you want to stop this function from downloading \
-    the package information file you can specify the get_pkg_info parameter \
-    as False. It still needs this file though. So you must put one with the \
-    correct name in the correct place by hand. This parameter exists mostly \
-    for offline testing.
-    :param download: By default all the files in a package's archive are \
-    downloaded. This parameter allows you to turn this feature off.
-    
-    """
-    import winsync
-    import winsync.lib.rget as rget
-    import winsync.lib.config as config
-    import os.path
-    import shutil
-    import subprocess
-    import time
-    
-    winsync_location = os.path.dirname( winsync.__file__ )
-    config.init_config( winsync_location )
-    config.init_sysinfo()
-    config.logger = installer.logger
-    
-    removed = False
-    
-    rget.start_session()
-
-    original_dir = os.getcwd()
-
-    try:
-        
-        flip_uac()
-
-        if get_pkg_info:
-            rget.download_info( package_name )
-    
-        installer._set_info( package_name, fake_download=(not download) )
-        os.chdir(installer.files_dir)
-        
-        #Download all the files from the repository if we are 
-        #going to test the install() method
-        if 'install' in test:
-            installer._download_from_repo()
-            
-        #Perform the tests
-        for method in test:
-            installer.logger.info( 'Beginning '+method )
-            ret = getattr(installer, method)()
-            installer.logger.info( 'Finished {} with the result: {}'.format(
-                                   method, ret ) )
-            if not ret:
-                #check() == False after removing a package is not an error
-                if not (removed and method == 'check'):
-                    installer.logger.error( method.capitalize()+' failed!' )
-                    return
-                
-            #Keep track of when we remove package, so when check() == False will
-            #not report an error.
-            if method == 'remove':
-                removed = True
-            else:
-                removed = False
-            
-            #Pause because some settings need time to sync
-            time.sleep( .5 )
-            
-        os.chdir(original_dir)
-        shutil.rmtree( installer.files_dir )
-    
-    finally:
-        flip_uac()
-        
-        #Gaurentee that the directory is reset
-        os.chdir(original_dir)
-
-        #Make sure we end the session with the repository
-        rget.end_session()
-
-def wget( url, out_file, options=None, invisible=False, cookies_file=None ):
-    """This function allows for fine grained access to the wget program. This
-    program is what performs all the downloading in the system. The wget
-    program has many features an capabilities. To learn more about what
-    it can do examine the
-    `wget manual <http://www.gnu.org/software/wget/manual/wget.html>`_.
-    
-    :param url: The URL is to be accessed (don't forget the protocol).
-    :param out_file: A string specifying where to store the downloaded \
-    resource.
-    :param options: A sequence of additional options given to the wget \
-    program. For example, you may want to specify \
-    ``['--continue', '--tries', '5']``, so that interrupted downloads are \
-    retried 5 times, and only the undownloaded parts are finished instead of \
-    re-downloading the whole file.
-    :param invisible: When True no information is printed to the screen.
-    :param cookies_file: If accessing a website that requires a login, you \
-    will need to store the session cookies in a file. This parameter is a \
-    the file path to that file.
-
-    """
-    import winsync.lib.config as config
-    import os.path
-    import subprocess
-    
-    wget_path = os.path.join( config.lib_dir, 'exec', 'wget.exe' )
-    
-    #Make sure we can find the wget command!
-    if not os.path.exists( wget_path ):
-        raise WinsyncException( 'Could not locate the wget program. '
-                                'Tried ' + wget_path )
-        
-    #Make sure that the options parameter is not a string type
-    assert not isinstance( options, str )
-    assert not isinstance( options, bytes )
-    
-    #Start building the command list.
-    cmd = [wget_path]
-    
-    #If we are not showing the window set wget to non-verbose mode
-    if invisible:
-        cmd.append( '-nv' )
-
-    #If additional options passed in, add it to the list
-    if options is not None:
-        cmd += options
-        
-    #If the user specified a cookies file use it
-    if cookies_file is not None:
-        if not os.path.exists( cookies_file ):
-            raise IOError( 'Could not find the specified cookies '
-                           'file: '+cookies_file )
-        else:
-            cmd += ['--load-cookies', cookies_file]
-    
-    #Finally, add the url and where to store the downloaded file.
-    cmd += [url, '-O', out_file]
-    
-    #config.logger.debug( 'Executing: ' + ' '.join( cmd ) )
-    
-    #Run wget
-    if invisible:
-        proc = subprocess.Popen( cmd, stderr=subprocess.PIPE )
-    else:
-        proc = subprocess.Popen( cmd )
-    
-    proc.wait()
-    
-    if proc.returncode != 0:
-        if invisible:
-            msg = 'The wget command failed. Reason:\n{}'.format(
-                proc.stderr.read().decode('UTF-8'))
-            raise WinsyncException( msg )
-        else:
-            raise subprocess.CalledProcessError( proc.returncode, cmd, '' )
-
-def uninstall_info( key_name, check_display_name=True ):
-    """This function will return a dictionary of the values in the
-    uninstall key found in the Windows registry matching the given regular
-    expression in key_name.
-    
-    A lot of programs, store a GUID as the key name. In
-    which case you will need to look through all keys and examine the
-    "DisplayName" value. This value is contains the program name shown in the
-    *Add and Remove Progams* dialog. About half the time the key's name and
-    "DisplayName" match, but just as often they don't. If you set the
-    ``check_display_name`` parameter to False, it will not examine the
-    "DisplayName" value of all the uninstall keys. This may make the function
-    much faster on systems with many installed programs. Only do this if you
-    know your program key name and  "DisplayName" match. To manually examine
-    uninstall information is not always easy. The uninstall information can
-    almost always be found in the registry at:
-    
-    ``HKLM\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Uninstall``
-        
-    For some examples of how to use Windows' uninstall information,
-    see :func:`uninstall_exists` and :func:`uninstall_cmd`.
-    
-    Note, this function works on both 32 and 64 bit systems.
-
-    :param key_name: A string containing a regular expression. This \
-    function uses :func:`re.match` to test for the correct program entry.
-    :param check_display_name: When True the DisplayName field of the \
-    registry keys is used to determine the key name (see the discussion \
-    above).
-    :return: A dictionary representing the program's uninstall information \
-    from the registry will be returned. The registry value names are the \
-    keys, and their associated data are the values. If no match is found then \
-    None is returned.
-    
-    """
-    from winreg import OpenKey, EnumKey, EnumValue, QueryValueEx
-    from winreg import KEY_READ, KEY_WOW64_64KEY, KEY_WOW64_32KEY
-    from winreg import HKEY_LOCAL_MACHINE, HKEY_USERS
-    
-
-    #Going through the registry twice once on the 64bit view and agian
-    #using the 32bit view is the recomended by microsoft.
-    for view in [KEY_WOW64_32KEY, KEY_WOW64_64KEY]:
-        #All of the 'Add and Remove Programs' entries are under this key
-        uninstall_tree = OpenKey( HKEY_LOCAL_MACHINE,
-                                  r'SOFTWARE\Microsoft\Windows'
-                                  r'\CurrentVersion\Uninstall',
-                                  0, KEY_READ | view )
-                                  
-        value = _uninstall_look_under( uninstall_tree, key_name, 
-                                       check_display_name )
-        
-        #If we found something then we are done
-        if value is not None:
-            return value
-
-            
-    #Looking in the standard place failed, We now need to enumerate
-    #HKEY_USERS and examine all the SID's under it. We still have to deal with
-    #the 32 bit vs. 64 bit problem.
-    for view in [KEY_WOW64_32KEY, KEY_WOW64_64KEY]:
-        try:
-            i = 0
-            while True:
-                sub_key = EnumKey(HKEY_USERS, i )
-                i = i + 1
-
-                try:
-                    uninstall_tree = OpenKey( HKEY_USERS,
-                                              sub_key + r'\SOFTWARE'
-                                              r'\Microsoft\Windows'
-                                              r'\CurrentVersion\Uninstall',
-                                              0, KEY_READ | view )
-                except WindowsError:
-                    #This HKEY_USERS subkey does not contain the uninstall tree
-                    continue
-                    
-                value = _uninstall_look_under( uninstall_tree, key_name,
-                                               check_display_name )
-
-                #If we found something then we are done
-                if value is not None:
-                    return value
-
-        except WindowsError:
-            #This error just means that we have finished the enumeration OR
-            #that the HKEY_USERS key does not contain the uninstall tree.
-            #Either way this is not an error.
-            pass
-            
-    #We could not find the information
-    return None
-        
-def _uninstall_look_under( uninstall_tree, key_name, check_display_name=True ):
-    """Multiple root keys have to be examined when searching for an uninstall
-    entry. To make the looping easier, the actual looking part is encapsulated
-    within this function.
-    
-    This function takes a top-level key that corresponds to
-    *\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Uninstall and searches its
-    children for a match.
-    
-    This function's return values and other parameters follow the rules laid
-    out by the uninstall_info() function.
-    """
-    from winreg import OpenKey, EnumKey, EnumValue, QueryValueEx
-    import re
-    
-    key_pattern = re.compile( key_name )
-    
-    #Loop through looking at all the names of the subkeys for a match for the
-    #key_name parameter.
-    #Looping through all the keys in _winreg is retarded. The stop condition
-    #is an exception, hence the try ... except and the infinit loop
-    try:
-        i = 0
-        while True:
-            subkey = EnumKey(uninstall_tree, i )
-            i = i + 1
-            
-            #We use this variable in case check_display_name is true, then
-            #we won't disturb the all important subkey variable
-            value_to_check = subkey
-            
-            #Grab up the DisplayName value from the registry if necessary
-            if check_display_name:
-                key = OpenKey( uninstall_tree, subkey )
-                try:
-                    value_to_check, type = QueryValueEx( key, 'DisplayName' )
-                except WindowsError:
-                    #This key does not have a DisplayName value, this is not
-                    #supposed to happen but it does. This usually occurs
-                    #with Windows Updates, or bad uninstallers. It is safe
-                    #to ignore this error.
-                    pass
-                finally:
-                    key.Close()
-
-            #If value_to_check's name matches the key
-            #pattern we have a match
-            if key_pattern.match( value_to_check ):
-                key = OpenKey( uninstall_tree, subkey )
-                index = 0
-                info = {}
-                try:
-                    while True:
-                        #Iterate over every value
-                        name, data, type = EnumValue( key, index )
-                        
-                        #Add the name and data it to the dictionary
-                        info[name] = data
-                        
-                        #Add one to the iterator
-                        index = index + 1
-                except WindowsError:
-                    #Return the information we have found
-                    return info
-                finally:
-                    key.Close()
-    except WindowsError:
-        #We failed to find the key
-        pass
-    finally:
-        uninstall_tree.Close()
-
-    #If we got to here then we failed to find a match
-    return None
-
-def uninstall_exists( key_name, version=None, check_display_name=True ):
-    """This function will return True if an uninstall entry can be found in the
-    windows registry that matches the key_name and version (if given). This
-    function is an easy and fast way to check if most programs are installed
-    in Windows. For example, you could check if Firefox is installed like
-    this::
-    
-        def check(self):
-            return util.uninstall_exists( 'Firefox.*' )
-            
-    :param version: A string containing a regular expression used to test \
-    against the program's version information. Note, this function uses \
-    :func:`re.match` to test if the versions are equivelent.
-    :return: True if an appropriate entry was found, False otherwise.
-    
-    For more information on the parameters and other issues see 
-    :func:`~winsync.lib.util.uninstall_info`.
-    
-    """
-    import re
-    info = uninstall_info( key_name, check_display_name )
-    
-    if info:
-        if version:
-            #Sometimes the version number is stored in DisplayVersion 
-            #instead of the Version value
-            if 'Version' not in info:
-                if 'DisplayVersion' in info:
-                    info['Version'] = info['DisplayVersion']
-                else:
-                    #The user asked for an exact version, the
-                    #registry lacks any version information,
-                    #therefore the test failed
-                    return False
-
-                return re.match( version, info['Version'] ) is not None
-        else:
-            return True
-    else:
-        return False
-
-def uninstall_cmd( key_name, check_display_name=True ):
-    """This function will return the uninstall command found in the
-    windows registry matching the key_name. The string
-    returned by this function is what is used by the "Add and Remove Progams"
-    dialog to uninstall programs. Since that method is not designed to use
-    silent uninstallation you will often have to alter the returned string
-    giving it the appropriate parameters. For example, the following
-    function uninstalls the
-    `Foxit Reader <http://www.foxitsoftware.com/Secure_PDF_Reader/>`_
-    program::
-    
-        def remove(self):
-            #Get the uninstall command string
-            cmd = util.uninstall_cmd( 'Foxit Reader.*' )
-            
-            #If we could not find the command, then fail
-            if cmd is None:
-                return False
-
-            #Replace the update switch with the remove switch,
-            #and break it apart based on spaces
-            cmd = cmd.replace( '/I', '/x' ).split( ' ' )
-
-            #Add some extras to suppress the GUI and rebooting
-            cmd += ['/passive', '/norestart']
-
-            #Run the uninstall program
-            subprocess.check_call( cmd )
-            
-            return True
-
-    For more information on the parameters and other issues see 
-    :func:`~winsync.lib.util.uninstall_info`.
-    
-    :return: A string containing the uninstall string from from the Windows \
-    registry, or None if the entry could not be found.
-    """
-    info = uninstall_info( key_name, check_display_name )
-    if isinstance( info, dict ):
-        return info['UninstallString']
-    else:
-        return False
-
-def task_kill( task ):
-    """This function uses the ``taskkill`` program to terminate a
-    the given program name forcefully. It is a convenience function
-    to wrap up some logic.
-    
-    :param task: The file name of the program to terminate, i.e. 'python.exe'.
-    :raise subprocess.CalledProcessError: If the ``taskkill`` program fails \
-    for any reason other than the fact that the program is not currently \
-    running this error is raised.
-    """
-    import subprocess
-    
-    try:
-        subprocess.check_output( ['taskkill', '/f', '/im', task], 
-                                 stderr=subprocess.STDOUT )
-    except subprocess.CalledProcessError as cpe:
-        #128 means the task is not running
-        if cpe.returncode != 128: raise
-        
-def extract7z( archive, dest_dir ):
-    """Extract the given archive into the given directory using 7-Zip.
-    The 7-Zip program works with many types of file archives including: zip,
-    tar, bzip, and rar. 7-Zip automatically detects what type of archive it
-    is and how to properly extract it. The command-line program is include with
-    the py:mod:`winsync` module.
-    
-    This function does have one side effect. It creates a log in the same
-    directory as the archive file called ``7z.log``. In the event that this
-    function fails, this file is left alone to help you determine what went
-    wrong. If this function succeeds, then the file is cleaned up.
-    
-    For more information about the 7-Zip program head over to
-    http://www.7-zip.org
-    
-    :param archive: A string specifying what archive file to be undone.
-    :param dest_dir: A string specifying what directory to extract the file \
-    into.
-    :raise winsync.lib.WinsyncException: This exception is raised for various \
-    reasons. The particular reasoning behind the failure can be found in the \
-    exception's message.
-    """
-    import subprocess
-    import os
-    import os.path
-   
-    if not os.path.exists( archive ):
-        raise WinsyncException('The file path of the archive does not exist.')
-    elif not os.path.exists( dest_dir ):
-        raise WinsyncException('The destination directory does not exist.')
-    elif not os.path.isdir( dest_dir ):
-        raise WinsyncException('The destination specified is not a directory.')
-    
-    curdir = os.getcwd()
-    os.chdir( dest_dir )
-
-    prog_path = os.path.join( config.lib_dir, 'exec', '7z.exe' )
-    log_path = os.path.join( os.path.dirname( archive ), '7z.log' )
-    
-    try:
-        with open( log_path, 'w' ) as f:
-            sevenz = subprocess.Popen( [prog_path, 'x', '-y', '-bd', archive],
-                                       stdout=f )
-            sevenz.communicate()
-            
-            if sevenz.returncode != 0:
-                raise WinsyncException( 'Failed to unzip the file properly, '
-                                        'check the log at ' + log_path )
-                
-        #If there is no error then get rid of the log file
-        os.remove( log_path )
-    finally:
-        os.chdir( curdir )
-
-        
-def create_shortcut( lnk_file, target_path, arguments=None,
-                     working_directory=None, description=None,
-                     hotkey=None, icon_location=None, icon_index=None,
-                     window_style=None ):
-    """This function creates a Windows shortcut.
-    There is not a dependency-less method for creating Windows shortcuts in
-    Python, so this function implements a round-about method for creating them.
-    It creates a temporary JScript file and executes Windows Scripting Host to
-    actually do the shortcut creation. Here is an example how you would use
-    this function::
-    
-        #Gather the needed paths for the shortcut
-        lnk = os.path.join( os.environ['ALLUSERSPROFILE'], 'Start Menu',
-                            'Programs', 'emacs.lnk' )
-        target = os.path.join( r'C:\\emacs\\bin\\runemacs.exe' )
-        icon = os.path.join( r'C:\\emacs\\etc\\icons\\emacs.ico' )
-        
-        #Create the shortcut
-        util.create_shortcut( lnk, target, icon_location=icon )
-
-    
-    Because the Windows API is being invoked to create the shortcut the 
-    arguments to this function closely corresponds to the 
-    `CreateShortcut <http://msdn.microsoft.com/en-us/library/xk6kst2k(v=vs.84).aspx>`_
-    scripting object. The arguments have the following meaning:
-    
-    :param lnk_file: A string indicating the file path of the shortcut \
-    file to be created (should end with a .lnk extension )
-    :param target_path: A string indicating file or directory the shortcut \
-    will point to.
-    :param arguments: A string representing any arguments that are to be \
-    passed to the target. For example a shortcut to python.exe that runs a \
-    module would need the argument string '-m module_name'.
-    :param working_directory: A string indicating the directory the target \
-    will start in (defaults to the directory containing the target path).
-    :param description: A string that gives a brief description of the \
-    shortcut, this message appears a the shortcut's tool-tip.
-    :param hotkey: A string representing the global key combination that will \
-    be associated with this shortcut. Can be any of the following: ALT+, \
-    CTRL+, SHIFT+, and/or a keyname. For example, 'CTRL+ALT+SHIFT+X' is a \
-    valid value.
-    :param icon_location: A string indicating the path to the file containing \
-    the shortcut's icon. By default is the target path is used.
-    :param icon_index: The zero based index of the icon inside the above \
-    mentioned file (default is 0).
-    :param window_style: Set the style of the window that will be shown. It \
-    must be either: 1 which displays the window in a "normal" state, 3 which \
-    displays a maximized window, or 7 which displays a minimized window.
-    
-    """
-    import os, os.path, re, subprocess, uuid
-    
-    #JScript needs / converted to \ and \ represented as \\
-    #This function makes the necessary adjustments
-    def fix_slashes(var):
-        if isinstance( var, str ):
-            var = var.replace( '/', '\\' ).replace( '\\', '\\\\' )
-        return var
-
-    lnk_file = fix_slashes( lnk_file )
-    target_path = fix_slashes( target_path )
-    arguments = fix_slashes( arguments )
-    working_directory = fix_slashes( working_directory )
-    description = fix_slashes( description )
-    hotkey = fix_slashes( hotkey )
-    icon_location = fix_slashes( icon_location )
-    
-    
-    #Figure out the temporary script file's path and name
-    script_file = os.path.join( os.environ['temp'], str(uuid.uuid4())+'.js' )
-    
-    #Set the default values if necessary
-    if not os.path.exists( target_path ):
-        raise WinsyncException( 'Cannot create a shortcut to a '
-                                 'nonexistent file.' )
-    if not working_directory:
-        working_directory = os.path.dirname( target_path )
-    if not icon_location:
-        icon_location = target_path
-    if not icon_index:
-        icon_index = 0
-
-    #Create the JScript file
-    with open( script_file, 'w' ) as script:
-        script.write( 'Shell = new ActiveXObject("WScript.Shell");\n' )
-        script.write( 'link = Shell.CreateShortcut("{}");\n'.format(lnk_file))
-        script.write( 'link.TargetPath = "{}";\n'.format( target_path ) )
-        script.write( 'link.WorkingDirectory = '
-                      '"{}";\n'.format( working_directory ) )
-        
-        #Set the optional properties
-        if arguments:
-            script.write( 'link.Arguments = "{}";\n'.format( arguments ) )
-        if icon_location:
-            script.write( 'link.IconLocation = "{},{}";\n'.format(
-                                    icon_location, icon_index ) )
-        if description:
-            script.write( 'link.Description = "{}";\n'.format( description ) )
-        if hotkey:
-            script.write( 'link.HotKey = "{}";\n'.format( hotkey ) )
-        if window_style:
-            script.write( 'link.WindowStyle = {};\n'.format( window_style ) )
-
-        script.write( 'link.Save();\n' )
-
-    #We need to make sure the script file is cleaned up, so wrap the process
-    #in a try-finally block.
-    try:
-        #Run our generated JScript file.
-        cscript = subprocess.Popen( ['cscript', '/nologo', script_file],
-                                    stdout=subprocess.PIPE,
-                                    stderr=subprocess.STDOUT )
-        (stdout, stderr) = cscript.communicate()
-        
-        if cscript.returncode != 0:
-            raise WinsyncException('Failed to create shortcut. Reason:\n'
-                                    '{}'.format(stdout.decode('ascii')))
-    finally:
-        #Cleanup the script file
-        os.remove( script_file )
-    
-def cacls( filename, options ):
-    """This function is a convenient wrapper for the CACLS program. The CACLS
-    program can be notoriously difficult to script because it sometimes
-    wants input but not always. This function takes much of the headache out
-    of using it. Here is an example::
-
-        link = r'C:\\Documents and Settings\\All Users\\Desktop\\jEdit.lnk'
-        util.cacls( link, ['/E', '/P', 'Student:R'] )
-        util.cacls( link, ['/E', '/G', 'Administrator:F'] )
-        util.cacls( link, ['/E', '/G', 'SYSTEM:F'] )
-
-    :param filename: This string represents what file or directory to run \
-    CACLS on.
-    :param options: A list of options to pass to the CACLS program.
-    """
-    import winsync.lib.config as config
-    import subprocess
-    
-    cmdline = ['cacls', filename]
-    cmdline.extend( options )
-    
-    #If you are not editing a permission, then you must allow it to go through
-    #by typing y on the command line. This variable will simulate it.
-    if '/E' not in options and '/e' not in options:
-        input = b'y\n'
-    else:
-        input = b''
-    
-    with subprocess.Popen( cmdline, stdin=subprocess.PIPE, 
-                           stdout=subprocess.PIPE,
-                           stderr=subprocess.STDOUT ) as proc:
-        (stdout, stderr) = proc.communicate( input )
-    
-        if proc.returncode != 0:
-            config.logger.error('CACLS failed, reason '
-                                'given: {}'.format(stdout.decode('ascii')))
-            raise subprocess.CalledProcessError( returncode=proc.returncode,
-                                                 cmd=cmdline, output=stdout )
-
-def rcacls( directory, options, topdown=False ):
-    """This function calls the CACLS program on all the files and directories
-    within the given directory (including the passed in directory). The
-    options parameter should be a list of options to be passed onto the CACLS
-    program. Essentially this function does a :func:`os.walk` across all the
-    files and subdirectories, starting the bottom of the tree, calling the
-    :func:`cacls()` function on each one.
-    
-    You might wonder why you should use this function instead of just using the
-    /T option in CACLS. Basically, you can easily run into situations where you
-    lock a directory but not the files and subdirectories inside of it.
-    
-    For more information see :func:`cacls`.
-    
-    :param topdown: This specifies the direction to walk through the directory.
-    """
-    import os, os.path
-    
-    for (dirpath, dirnames, filenames) in os.walk( directory, topdown=False):
-        print( 'Processing directory: '+dirpath )
-        for fname in filenames:
-            cacls( os.path.join( dirpath, fname ), options )
-        
-        for fname in dirnames:
-            cacls( os.path.join( dirpath, fname ), options )
-
-uac_installed = None
-def flip_uac():
-    """This function turns UAC on or off depending on its state. When the
-    function is first called, it first determines if UAC is installed and
-    what its current state is. If UAC is enabled, it will turn it off. If
-    UAC is off then it will leave it alone.
-    
-    When called a second time this function will return UAC to the state
-    it first found it in.
-    
-    If the system does not have UAC (e.g. Windows XP) then this function
-    will do nothing.
-    """
-    import subprocess
-    
-    global uac_installed
-    global uac_state
-
-    #This is the first run of the function
-    if uac_installed is None:
-        try:
-            state = subprocess.check_output(['reg', 'QUERY', 
-                                             'HKEY_LOCAL_MACHINE\\SOFTWARE\\'
-                                             'Microsoft\\Windows\\'
-                                             'CurrentVersion\\Policies\\'
-                                             'System',
-                                              '/v', 'EnableLUA'] )
-        except:
-            #This occurs when the machine does not have UAC
-            uac_installed = False
-            return
-
-        state = state.decode( 'ascii' )
-        
-        #If there was no error then UAC is installed
-        uac_installed = 'ERROR' not in state
-        
-        if '0x1' in state:
-            uac_state = True
-        else:
-            #Since the initial condition is that UAC exists but
-            #it is turned off, then just don't do any flipping
-            uac_state = False
-            uac_installed = False
-            
-
-    if uac_installed:
-        #Rotate the state so we set it to its oposite
-        uac_state = not uac_state
-        
-        subprocess.check_call( ['reg', 'ADD', 
-                                'HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\'
-                                'Windows\\CurrentVersion\\Policies\\System',
-                                '/v', 'EnableLUA', '/t', 'REG_DWORD', '/d',
-                                str(int(uac_state)), '/f'],
-                                stdout=subprocess.PIPE )
-
-
-#Stubs until I can update
-def countdown(seconds, message='Waiting {} seconds'):
-    pass
-def create_shortcut( lnk_file, target_path, arguments=None,
-                     working_directory=None, description=None,
-                     hotkey=None, icon_location=None, icon_index=None,
-                     window_style=None ):
-    pass
-
-def is_admin():
-    pass
-
-def get_special_folder(name):
-    return ''
+"""
+This module hosts many functions and objects needed to create installation
+scripts. This is one of the most important modules in the entire
+:mod:`winsync` library. The types of objects and functions hosted within
+this module are quite diverse, so users need import as few modules as possible.
+
+The preferred way to import this module is like this::
+
+      import winsync.lib.util as util
+
+Importing the module in this manner allow you to refer to it using only the
+``util`` prefix.
+"""
+
+import concurrent.futures
+import contextlib
+import functools
+import json
+import logging
+import os, os.path
+import re
+import shutil
+import subprocess
+import sys
+import time
+import uuid
+
+#The winreg module only exists on Windows. Guard it so this module
+#still imports for offline tooling on other platforms.
+if sys.platform == 'win32':
+    from winreg import OpenKey, EnumKey, EnumValue, QueryValueEx
+    from winreg import QueryInfoKey
+    from winreg import KEY_READ, KEY_WOW64_64KEY, KEY_WOW64_32KEY
+    from winreg import HKEY_LOCAL_MACHINE, HKEY_USERS
+
+import winsync
+import winsync.lib.config as config
+import winsync.lib.rget as rget
+
+class WinsyncException(Exception):
+    pass
+
+#The logger every Installer shares. A bound Logger dispatches straight
+#to its handlers, where the logging-module-level functions each redo a
+#root-logger lookup per call.
+_logger = logging.getLogger( 'winsync' )
+
+@functools.lru_cache( maxsize=256 )
+def _compile_key( key_name ):
+    """Compile an uninstall-key regular expression. Checks like
+    uninstall_exists are commonly repeated with the same pattern during
+    a run, the cache hands those repeats the already compiled object.
+    """
+    return re.compile( key_name )
+
+@functools.lru_cache( maxsize=4 )
+def _exec_path( name ):
+    """Resolve the path of a program bundled in lib/exec and make sure
+    it is actually there. Multi-package sessions run these programs many
+    times, the cache limits the path join and existence check to once
+    per program.
+    """
+    path = os.path.join( config.lib_dir, 'exec', name )
+
+    if not os.path.exists( path ):
+        raise WinsyncException( 'Could not locate the {} program. '
+                                'Tried {}'.format( name, path ) )
+
+    return path
+
+def _fast_rmtree( path ):
+    """Delete the directory tree at the given path. On Windows the whole
+    job is handed to the native rmdir command in a single process, which
+    clears large trees far faster than walking them with one Python
+    syscall per entry. Anything rmdir leaves behind, or any other
+    platform, goes through shutil.rmtree.
+    """
+    if sys.platform == 'win32':
+        subprocess.run( ['cmd', '/c', 'rmdir', '/S', '/Q', path] )
+
+        if not os.path.exists( path ):
+            return
+
+    shutil.rmtree( path )
+
+#Cache of parsed package information keyed by package id. Repeated
+#installer runs in one session reparse the same ini file, this lets
+#them share one PackageInfo. Entries remember the info file's mtime so
+#a freshly downloaded file replaces the stale parse.
+_pkg_info_cache = {}
+
+class Installer:
+    """This is the Installer prototype class. All individual installation
+    scripts must contain a subclass of this class.
+    
+    The two most important methods are the install and check method. These two
+    method form the backbone of any installation script. They are the only
+    two methods you **must** override.
+    
+    Instances of this class have access to several convenient attributes. They
+    are designed to help make the life of installation script writers easier.
+    
+    * The ``logger`` attribute allow you access to the clients logging \
+    functionality. This attribute is an instance of the \
+    :class:`logging.Logger` class. You can use it to easily add your own log \
+    entries to the installation log file. You use it like this::
+        
+        def install(self):
+            #Perform your installation here ...
+            
+            self.logger.info( 'Finished the installation.' )
+            return True
+            
+    * The ``files_dir`` attribute points to where the installation files for \
+    your system have been downloaded. For example, say you simply have to \
+    silently run a file called install.exe, you could do it like this::
+    
+        def install(self):
+            exe = os.path.join( self.files_dir, 'install.exe' )
+            subprocess.check_call( [exe, '/S'] )
+            return True
+    
+    * You have direct access to the data stored in the package information \
+    file through the ``package`` attribute. This attribute an instance of the \
+    :class:`winsync.lib.PackageInfo` class.
+    
+    """
+    def __init__( self ):
+        #Only set up logging when nothing has configured it yet, rather
+        #than re-running basicConfig for every instantiation
+        if not logging.getLogger().handlers:
+            logging.basicConfig( level=logging.DEBUG )
+
+        self.logger = _logger
+        self.fake_download = True
+        self.files_dir = None
+        
+    def check( self ):
+        """This function checks to see if a package is installed. It should
+        return True if the package is installed, and False otherwise. This
+        function must be overloaded, otherwise the install method will always
+        be seen to fail.
+        """
+        return False
+    def install( self ):
+        """This method installs the package. It should return True if it
+        believes that the install went successfully. The main program will
+        still call the :meth:`check` method afterward to make sure. This
+        method **must be defined**.
+        """
+        return False
+    def upgrade( self ):
+        """This method performs an upgrade from the current state. By default,
+        it simply calls the install method. But you can override it if you need
+        to do something special.
+        """
+        return self.install()
+    def remove( self ):
+        """This method removes the package from the system. By default it 
+        simply returns True, and does nothing else. Essentially this will
+        tell the :mod:`winsync` to stop managing the package and remove it
+        from its cache, in general this is not the desired behavior. If you
+        want to actually remove the package's files from the system then
+        you should override this method.
+        """
+        return True
+
+    def _set_info( self, package, logger=None, fake_download=False ):
+        """Sets the package info from the ini file and logger attribute for
+        this object. That way users can access detailed information about the
+        program directly within the object. Do not override this method.
+        """
+        from winsync.lib.PackageInfo import PackageInfo
+        
+        self.fake_download = fake_download
+
+        #If the user passes in a PackageInfo instance then set it,
+        #Otherwise treat it as a string and load the info file. Parsed
+        #info is cached per id and reused while the file is unchanged.
+        if isinstance(package, PackageInfo ):
+            self.package = package
+        else:
+            ini_path = os.path.join( config.pkg_dir, package+'.ini' )
+            try:
+                mtime = os.path.getmtime( ini_path )
+            except OSError:
+                mtime = None
+
+            cached = _pkg_info_cache.get( package )
+            if cached is not None and cached[0] == mtime:
+                self.package = cached[1]
+            else:
+                self.package = PackageInfo( package, skip_dependents=True,
+                                            skip_download=True )
+                _pkg_info_cache[package] = (mtime, self.package)
+        
+        self.files_dir = os.path.join( config.spool_dir, self.package.id )
+        self.package.files_dir = self.files_dir
+        
+        #makedirs does the existence handling itself, no stat-then-mkdir
+        os.makedirs( self.files_dir, exist_ok=True )
+        
+        if logger is not None:
+            self.logger = logger
+            
+    def _cleanup( self ):
+        """This method will delete the files_dir created in set_info()."""
+        _fast_rmtree( self.files_dir )
+        
+    def _download_from_repo( self ):
+        """The purpose of this method is to simplify the downloading of the
+        package files from the repository. This method will divine the correct
+        URL for the file, it will then return the downloaded file's path.
+
+        An archive that a previous run already downloaded is not fetched
+        again: each successful download leaves a small manifest beside
+        the files recording the package version and file sizes, and as
+        long as it still matches what is on disk the network is skipped.
+        """
+        if self.fake_download:
+            return self.files_dir
+
+        if self._archive_is_current():
+            #Point the package at the files already on disk, the same
+            #way download_archive would have
+            self.package.rget_files = {
+                file: os.path.join( self.files_dir, file )
+                for file in self.package.files }
+
+            return self.files_dir
+
+        rget.download_archive( self.package )
+        self._write_manifest()
+
+        return self.files_dir
+
+    def _manifest_path( self ):
+        return os.path.join( self.files_dir, '.manifest' )
+
+    def _archive_is_current( self ):
+        """Return whether the manifest left by a previous download still
+        describes the package version and the files sitting in files_dir.
+        """
+        try:
+            with open( self._manifest_path() ) as f:
+                manifest = json.load( f )
+        except (IOError, ValueError):
+            return False
+
+        if manifest.get( 'version' ) != self.package.version:
+            return False
+
+        files = manifest.get( 'files', {} )
+        if set( files ) != set( self.package.files ):
+            return False
+
+        for file, size in files.items():
+            try:
+                if os.path.getsize( os.path.join( self.files_dir,
+                                                  file ) ) != size:
+                    return False
+            except OSError:
+                return False
+
+        return True
+
+    def _write_manifest( self ):
+        """Record the version and file sizes of a finished download so
+        the next run can recognize the archive is already here.
+        """
+        files = {}
+        for file in self.package.files:
+            try:
+                files[file] = os.path.getsize( os.path.join( self.files_dir,
+                                                             file ) )
+            except OSError:
+                #A missing file means the archive is incomplete, leave
+                #no manifest so the next run downloads again
+                return
+
+        with open( self._manifest_path(), 'w' ) as f:
+            json.dump( {'version': self.package.version, 'files': files}, f )
+
+def _wait_for_settle( installer, expect, timeout=2.0 ):
+    """Wait for installer.check() to report the expected state after an
+    install or remove. Some settings need a moment to sync, so poll with
+    a short exponential backoff rather than sleeping a flat half second.
+    The fast path returns in tens of milliseconds while the timeout
+    keeps the old worst-case patience for slow settings.
+    """
+    deadline = time.time() + timeout
+    delay = 0.05
+
+    while time.time() < deadline:
+        #Drop the memoized registry lookups before every poll,
+        #otherwise check() would just repeat its first answer and the
+        #loop could never observe the registry settling
+        uninstall_info.cache_clear()
+
+        if bool( installer.check() ) == expect:
+            return
+
+        time.sleep( delay )
+        delay = min( delay * 2, 0.4 )
+
+def test_installer( installer, package_name,
+                    test=['install', 'check', 'remove', 'check'],
+                    get_pkg_info=True, download=True ):
+    """This is a convenience function used to test all aspects of an 
+    :class:`Installer` object. It can test the :meth:`Installer.install`,
+    :meth:`Installer.check`, :meth:`Installer.upgrade`, and
+    :meth:`Installer.remove` methods. This function will download the package
+    information file before beginning the tests. So make sure that the
+    repository is aware of your package's existence. It will
+    *not download the install script* since that is what we are testing.
+    
+    Usually you would only want this function to be executed when the script is
+    run on its own. So semantically you use it like this::
+
+        import winsync.lib.util as util
+
+        class Firefox(util.Installer):
+            def check(self):
+                return util.uninstall_exists( 'Firefox.*' )
+            def install(self):
+                pass #TODO: install code
+            def remove(self):
+                pass #TODO: uninstall code
+
+        if __name__ == '__main__':
+            util.test_installer( Firefox(), 'firefox', test=['check'] )
+
+    This function does not return anything. It will output a log of the
+    activities to the screen. If the install or upgrade methods returns False
+    or have an exception raised, this function will simply return.
+    
+    :param installer: This is an instance of the :class:`Installer` class \
+    you want to test.
+    :param package_name: This is the unique package identifier that the \
+    function can use to access the correct package information file.
+    :param test: This parameter is very important. It sets what functions are \
+    tested and in what order. The test parameter must be a list of strings. \
+    Each string must be either: install, check, upgrade, or remove. This \
+    allows you the flexibility to test the methods in any order. For example, \
+    after you finish working on the remove method, you may want to skip \
+    testing the install and check methods. By default, the upgrade method is \
+    skipped.    
+    :param get_pkg_info: If you want to stop this function from downloading \
+    the package information file you can specify the get_pkg_info parameter \
+    as False. It still needs this file though. So you must put one with the \
+    correct name in the correct place by hand. This parameter exists mostly \
+    for offline testing.
+    :param download: By default all the files in a package's archive are \
+    downloaded. This parameter allows you to turn this feature off.
+    
+    """
+    winsync_location = os.path.dirname( winsync.__file__ )
+    config.init_config( winsync_location )
+    config.init_sysinfo()
+    config.logger = installer.logger
+    
+    removed = False
+
+    rget.start_session()
+
+    try:
+        flip_uac()
+
+        if get_pkg_info:
+            rget.download_info( package_name )
+
+        installer._set_info( package_name, fake_download=(not download) )
+
+        #contextlib.chdir guarantees the original directory is restored
+        #on the way out, so the manual resets that used to run both
+        #before the cleanup and again in the finally are gone
+        with contextlib.chdir( installer.files_dir ):
+
+            #Download all the files from the repository if we are
+            #going to test the install() method
+            if 'install' in test:
+                installer._download_from_repo()
+
+            #Perform the tests
+            for method in test:
+                installer.logger.info( 'Beginning '+method )
+                ret = getattr(installer, method)()
+                installer.logger.info( 'Finished {} with the result: {}'.format(
+                                       method, ret ) )
+                if not ret:
+                    #check() == False after removing a package is not an error
+                    if not (removed and method == 'check'):
+                        installer.logger.error( method.capitalize()+' failed!' )
+                        return
+
+                #Keep track of when we remove package, so when check() == False
+                #will not report an error.
+                if method == 'remove':
+                    removed = True
+                else:
+                    removed = False
+
+                #The method may have changed what is installed, which
+                #makes the memoized registry lookups stale
+                if method != 'check':
+                    uninstall_info.cache_clear()
+
+                #Pause because some settings need time to sync, but only
+                #after a state change and only until check() agrees
+                if method == 'install':
+                    _wait_for_settle( installer, True )
+                elif method == 'remove':
+                    _wait_for_settle( installer, False )
+
+        installer._cleanup()
+
+    finally:
+        flip_uac()
+
+        #Make sure we end the session with the repository
+        rget.end_session()
+
+def wget( url, out_file, options=None, invisible=False, cookies_file=None ):
+    """This function allows for fine grained access to the wget program. This
+    program is what performs all the downloading in the system. The wget
+    program has many features an capabilities. To learn more about what
+    it can do examine the
+    `wget manual <http://www.gnu.org/software/wget/manual/wget.html>`_.
+    
+    :param url: The URL is to be accessed (don't forget the protocol).
+    :param out_file: A string specifying where to store the downloaded \
+    resource.
+    :param options: A sequence of additional options given to the wget \
+    program. For example, you may want to specify \
+    ``['--continue', '--tries', '5']``, so that interrupted downloads are \
+    retried 5 times, and only the undownloaded parts are finished instead of \
+    re-downloading the whole file.
+    :param invisible: When True no information is printed to the screen.
+    :param cookies_file: If accessing a website that requires a login, you \
+    will need to store the session cookies in a file. This parameter is a \
+    the file path to that file.
+
+    """
+    #Make sure we can find the wget command!
+    wget_path = _exec_path( 'wget.exe' )
+
+
+    #Make sure that the options parameter is not a string type
+    assert not isinstance( options, str )
+    assert not isinstance( options, bytes )
+    
+    #Start building the command list.
+    cmd = [wget_path]
+    
+    #If we are not showing the window set wget to non-verbose mode
+    if invisible:
+        cmd.append( '-nv' )
+
+    #If additional options passed in, add it to the list
+    if options is not None:
+        cmd += options
+        
+    #If the user specified a cookies file use it
+    if cookies_file is not None:
+        if not os.path.exists( cookies_file ):
+            raise IOError( 'Could not find the specified cookies '
+                           'file: '+cookies_file )
+        else:
+            cmd += ['--load-cookies', cookies_file]
+    
+    #Finally, add the url and where to store the downloaded file.
+    cmd += [url, '-O', out_file]
+    
+    #config.logger.debug( 'Executing: ' + ' '.join( cmd ) )
+    
+    #Run wget. In invisible mode the stderr chatter is captured for the
+    #error message and wget is kept from allocating a console window.
+    #CREATE_NO_WINDOW only exists on Windows, hence the getattr.
+    if invisible:
+        result = subprocess.run( cmd, stderr=subprocess.PIPE,
+                                 creationflags=getattr( subprocess,
+                                     'CREATE_NO_WINDOW', 0 ) )
+
+        if result.returncode != 0:
+            msg = 'The wget command failed. Reason:\n{}'.format(
+                result.stderr.decode('UTF-8'))
+            raise WinsyncException( msg )
+    else:
+        result = subprocess.run( cmd )
+
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError( result.returncode, cmd, '' )
+
+@functools.lru_cache( maxsize=128 )
+def uninstall_info( key_name, check_display_name=True ):
+    """This function will return a dictionary of the values in the
+    uninstall key found in the Windows registry matching the given regular
+    expression in key_name.
+
+    Each lookup walks four registry trees, so results are cached per
+    (key_name, check_display_name) pair; check()/remove() pairs that
+    probe the same program share one walk. Treat the returned dictionary
+    as read-only, and call ``uninstall_info.cache_clear()`` after
+    installing or removing a program whose entry the cache may hold.
+    
+    A lot of programs, store a GUID as the key name. In
+    which case you will need to look through all keys and examine the
+    "DisplayName" value. This value is contains the program name shown in the
+    *Add and Remove Progams* dialog. About half the time the key's name and
+    "DisplayName" match, but just as often they don't. If you set the
+    ``check_display_name`` parameter to False, it will not examine the
+    "DisplayName" value of all the uninstall keys. This may make the function
+    much faster on systems with many installed programs. Only do this if you
+    know your program key name and  "DisplayName" match. To manually examine
+    uninstall information is not always easy. The uninstall information can
+    almost always be found in the registry at:
+    
+    ``HKLM\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Uninstall``
+        
+    For some examples of how to use Windows' uninstall information,
+    see :func:`uninstall_exists` and :func:`uninstall_cmd`.
+    
+    Note, this function works on both 32 and 64 bit systems.
+
+    :param key_name: A string containing a regular expression. This \
+    function uses :func:`re.match` to test for the correct program entry.
+    :param check_display_name: When True the DisplayName field of the \
+    registry keys is used to determine the key name (see the discussion \
+    above).
+    :return: A dictionary representing the program's uninstall information \
+    from the registry will be returned. The registry value names are the \
+    keys, and their associated data are the values. If no match is found then \
+    None is returned.
+    
+    """
+    #The same pattern is matched against every candidate key in every
+    #view, so compile it exactly once up front
+    key_pattern = _compile_key( key_name )
+
+    #Going through the registry twice once on the 64bit view and agian
+    #using the 32bit view is the recomended by microsoft. The scans are
+    #independent and spend their time in registry round-trips that
+    #release the GIL, so they run in parallel and the first hit wins:
+    #one worker per HKLM view, plus one covering both views of
+    #HKEY_USERS off a single SID enumeration.
+    with concurrent.futures.ThreadPoolExecutor( max_workers=3 ) as executor:
+        futures = [ executor.submit( _scan_machine, view, key_pattern,
+                                     check_display_name )
+                    for view in (KEY_WOW64_32KEY, KEY_WOW64_64KEY) ]
+        futures.append( executor.submit( _scan_users, key_pattern,
+                                         check_display_name ) )
+
+        for future in concurrent.futures.as_completed( futures ):
+            value = future.result()
+
+            #If we found something then we are done
+            if value is not None:
+                for other in futures:
+                    other.cancel()
+                return value
+
+    #We could not find the information
+    return None
+
+def _scan_machine( view, key_pattern, check_display_name ):
+    """Search the given registry view of HKEY_LOCAL_MACHINE's uninstall
+    tree. This is one worker of uninstall_info's parallel scan; its
+    parameters and return value follow uninstall_info's rules.
+    """
+    #All of the 'Add and Remove Programs' entries are under this key
+    uninstall_tree = OpenKey( HKEY_LOCAL_MACHINE,
+                              r'SOFTWARE\Microsoft\Windows'
+                              r'\CurrentVersion\Uninstall',
+                              0, KEY_READ | view )
+
+    return _uninstall_look_under( uninstall_tree, key_pattern,
+                                  check_display_name )
+
+#HKEY_USERS hives that never hold uninstall entries: the default
+#profile, the service accounts, and the per-user _Classes pseudo-hives.
+#Probing them is a guaranteed-to-fail OpenKey each, so they are skipped.
+_SKIP_SID_EXACT = frozenset( ('.DEFAULT', 'S-1-5-18', 'S-1-5-19',
+                              'S-1-5-20') )
+_SKIP_SID_SUFFIX = '_Classes'
+
+def _scan_users( key_pattern, check_display_name ):
+    """Search every SID under HKEY_USERS, in both registry views, for an
+    uninstall tree containing a match. This is one worker of
+    uninstall_info's parallel scan; its parameters and return value
+    follow uninstall_info's rules.
+    """
+    #Enumerate the SID list exactly once and share it between the two
+    #views, instead of walking HKEY_USERS again per view. QueryInfoKey
+    #reports how many SIDs there are, so the enumeration runs exactly
+    #that far instead of calling EnumKey until it raises.
+    sids = [ EnumKey( HKEY_USERS, i )
+             for i in range( QueryInfoKey( HKEY_USERS )[0] ) ]
+
+    for sub_key in sids:
+        #Skip the hives that are known never to hold uninstall data
+        if sub_key in _SKIP_SID_EXACT or \
+           sub_key.endswith( _SKIP_SID_SUFFIX ):
+            continue
+
+        for view in (KEY_WOW64_32KEY, KEY_WOW64_64KEY):
+            try:
+                uninstall_tree = OpenKey( HKEY_USERS,
+                                          sub_key + r'\SOFTWARE'
+                                          r'\Microsoft\Windows'
+                                          r'\CurrentVersion\Uninstall',
+                                          0, KEY_READ | view )
+            except WindowsError:
+                #This HKEY_USERS subkey does not contain the uninstall
+                #tree in this view
+                continue
+
+            value = _uninstall_look_under( uninstall_tree, key_pattern,
+                                           check_display_name )
+
+            #If we found something then we are done
+            if value is not None:
+                return value
+
+    return None
+
+def _uninstall_look_under( uninstall_tree, key_pattern,
+                           check_display_name=True ):
+    """Multiple root keys have to be examined when searching for an uninstall
+    entry. To make the looping easier, the actual looking part is encapsulated
+    within this function.
+    
+    This function takes a top-level key that corresponds to
+    *\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Uninstall and searches its
+    children for a match.
+    
+    This function's return values and other parameters follow the rules laid
+    out by the uninstall_info() function.
+    """
+    #Loop through looking at all the names of the subkeys for a match for
+    #the key pattern. QueryInfoKey supplies the subkey count, which
+    #bounds the loop without the old exception-as-stop-condition idiom.
+    try:
+        for i in range( QueryInfoKey( uninstall_tree )[0] ):
+            subkey = EnumKey( uninstall_tree, i )
+            
+            #We use this variable in case check_display_name is true, then
+            #we won't disturb the all important subkey variable
+            value_to_check = subkey
+
+            #One handle per candidate: the DisplayName lookup opens it,
+            #and a match reuses it for the value enumeration rather than
+            #opening the same key a second time
+            key = None
+            try:
+                #Grab up the DisplayName value from the registry if
+                #necessary. When the subkey's own name already satisfies
+                #the pattern the key is a match either way, so the
+                #lookup is skipped.
+                if check_display_name and not key_pattern.match( subkey ):
+                    key = OpenKey( uninstall_tree, subkey )
+                    try:
+                        value_to_check, type = QueryValueEx( key,
+                                                             'DisplayName' )
+                    except WindowsError:
+                        #This key does not have a DisplayName value, this is
+                        #not supposed to happen but it does. This usually
+                        #occurs with Windows Updates, or bad uninstallers.
+                        #It is safe to ignore this error.
+                        pass
+
+                #If value_to_check's name matches the key
+                #pattern we have a match
+                if key_pattern.match( value_to_check ):
+                    if key is None:
+                        key = OpenKey( uninstall_tree, subkey )
+
+                    #QueryInfoKey reports how many values the key holds,
+                    #so the loop can run exactly that many times rather
+                    #than calling EnumValue until it raises
+                    n_values = QueryInfoKey( key )[1]
+
+                    return { name: data for name, data, type in
+                             ( EnumValue( key, index )
+                               for index in range( n_values ) ) }
+            finally:
+                if key is not None:
+                    key.Close()
+    except WindowsError:
+        #We failed to find the key
+        pass
+    finally:
+        uninstall_tree.Close()
+
+    #If we got to here then we failed to find a match
+    return None
+
+def uninstall_exists( key_name, version=None, check_display_name=True ):
+    """This function will return True if an uninstall entry can be found in the
+    windows registry that matches the key_name and version (if given). This
+    function is an easy and fast way to check if most programs are installed
+    in Windows. For example, you could check if Firefox is installed like
+    this::
+    
+        def check(self):
+            return util.uninstall_exists( 'Firefox.*' )
+            
+    :param version: A string containing a regular expression used to test \
+    against the program's version information. Note, this function uses \
+    :func:`re.match` to test if the versions are equivelent.
+    :return: True if an appropriate entry was found, False otherwise.
+    
+    For more information on the parameters and other issues see 
+    :func:`~winsync.lib.util.uninstall_info`.
+    
+    """
+    info = uninstall_info( key_name, check_display_name )
+
+    if not info:
+        return False
+
+    if version is None:
+        return True
+
+    #Sometimes the version number is stored in DisplayVersion instead
+    #of the Version value. Read without writing back, the dictionary is
+    #shared through uninstall_info's cache. Version can also be a
+    #number, registry DWORDs come back as ints, hence the str().
+    found_version = info.get( 'Version' ) or info.get( 'DisplayVersion' )
+
+    #The user asked for an exact version, when the registry lacks any
+    #version information the test failed
+    if found_version is None:
+        return False
+
+    return _compile_key( version ).match( str(found_version) ) is not None
+
+def uninstall_cmd( key_name, check_display_name=True ):
+    """This function will return the uninstall command found in the
+    windows registry matching the key_name. The string
+    returned by this function is what is used by the "Add and Remove Progams"
+    dialog to uninstall programs. Since that method is not designed to use
+    silent uninstallation you will often have to alter the returned string
+    giving it the appropriate parameters. For example, the following
+    function uninstalls the
+    `Foxit Reader <http://www.foxitsoftware.com/Secure_PDF_Reader/>`_
+    program::
+    
+        def remove(self):
+            #Get the uninstall command string
+            cmd = util.uninstall_cmd( 'Foxit Reader.*' )
+            
+            #If we could not find the command, then fail
+            if cmd is None:
+                return False
+
+            #Replace the update switch with the remove switch,
+            #and break it apart based on spaces
+            cmd = cmd.replace( '/I', '/x' ).split( ' ' )
+
+            #Add some extras to suppress the GUI and rebooting
+            cmd += ['/passive', '/norestart']
+
+            #Run the uninstall program
+            subprocess.check_call( cmd )
+            
+            return True
+
+    For more information on the parameters and other issues see 
+    :func:`~winsync.lib.util.uninstall_info`.
+    
+    :return: A string containing the uninstall string from from the Windows \
+    registry, or None if the entry could not be found.
+    """
+    info = uninstall_info( key_name, check_display_name )
+
+    #The docstring has always promised None on a miss, but a miss used
+    #to come back as False, so the documented "if cmd is None" test
+    #never fired
+    if info:
+        return info.get( 'UninstallString' )
+
+    return None
+
+def task_kill( *tasks ):
+    """This function uses the ``taskkill`` program to terminate
+    the given program names forcefully. It is a convenience function
+    to wrap up some logic.
+
+    Any number of program names may be given, and they are all handed
+    to a single taskkill invocation; installers that close several
+    helper programs pay one process start instead of one per name. For
+    compatibility a single list or tuple of names also works::
+
+        util.task_kill( 'java.exe', 'javaw.exe' )
+
+    :param tasks: The file names of the programs to terminate, \
+    i.e. 'python.exe'.
+    :raise subprocess.CalledProcessError: If the ``taskkill`` program fails \
+    for any reason other than the fact that a program is not currently \
+    running this error is raised.
+    """
+    #Accept the old style of passing one sequence of names
+    if len( tasks ) == 1 and isinstance( tasks[0], (list, tuple) ):
+        tasks = tasks[0]
+
+    cmd = ['taskkill', '/f']
+    for task in tasks:
+        cmd += ['/im', task]
+
+    try:
+        subprocess.check_output( cmd, stderr=subprocess.STDOUT )
+    except subprocess.CalledProcessError as cpe:
+        #128 means the task is not running
+        if cpe.returncode != 128: raise
+        
+def extract7z( archive, dest_dir ):
+    """Extract the given archive into the given directory using 7-Zip.
+    The 7-Zip program works with many types of file archives including: zip,
+    tar, bzip, and rar. 7-Zip automatically detects what type of archive it
+    is and how to properly extract it. The command-line program is include with
+    the py:mod:`winsync` module.
+    
+    This function does have one side effect. In the event that this
+    function fails, it creates a log in the same directory as the archive
+    file called ``7z.log`` to help you determine what went wrong. If this
+    function succeeds, then nothing is written to disk besides the
+    extracted files themselves.
+    
+    For more information about the 7-Zip program head over to
+    http://www.7-zip.org
+    
+    :param archive: A string specifying what archive file to be undone.
+    :param dest_dir: A string specifying what directory to extract the file \
+    into.
+    :raise winsync.lib.WinsyncException: This exception is raised for various \
+    reasons. The particular reasoning behind the failure can be found in the \
+    exception's message.
+    """
+    if not os.path.exists( archive ):
+        raise WinsyncException('The file path of the archive does not exist.')
+
+    #One makedirs call covers the old exists and isdir probes: a missing
+    #destination is created, an existing directory passes, and an
+    #existing file raises
+    try:
+        os.makedirs( dest_dir, exist_ok=True )
+    except OSError:
+        raise WinsyncException('The destination specified is not a directory.')
+    
+    prog_path = _exec_path( '7z.exe' )
+    log_path = os.path.join( os.path.dirname( archive ), '7z.log' )
+
+    #contextlib.chdir restores the caller's directory on the way out
+    with contextlib.chdir( dest_dir ):
+        #-bso0 silences the per-file progress chatter at the source and
+        #-bse2 pins real errors to stderr, so a successful extraction of
+        #a large archive no longer writes megabytes of log to disk only
+        #to delete them
+        sevenz = subprocess.run( [prog_path, 'x', '-y', '-bd',
+                                  '-bso0', '-bse2', archive],
+                                 stdout=subprocess.DEVNULL,
+                                 stderr=subprocess.PIPE )
+
+        if sevenz.returncode != 0:
+            #Only a failure writes the log
+            with open( log_path, 'wb' ) as f:
+                f.write( sevenz.stderr )
+
+            raise WinsyncException( 'Failed to unzip the file properly, '
+                                    'check the log at ' + log_path )
+
+        
+def create_shortcut( lnk_file, target_path, arguments=None,
+                     working_directory=None, description=None,
+                     hotkey=None, icon_location=None, icon_index=None,
+                     window_style=None ):
+    """This function creates a Windows shortcut.
+    There is not a dependency-less method for creating Windows shortcuts in
+    Python, so this function implements a round-about method for creating them.
+    When the pywin32 package is available the shortcut is made through an
+    in-process COM call to the very same scripting object, which skips
+    the script file and the cscript.exe process entirely. Without pywin32
+    it falls back to writing a temporary JScript file and executing
+    Windows Scripting Host to actually do the shortcut creation. Here is
+    an example how you would use this function::
+    
+        #Gather the needed paths for the shortcut
+        lnk = os.path.join( os.environ['ALLUSERSPROFILE'], 'Start Menu',
+                            'Programs', 'emacs.lnk' )
+        target = os.path.join( r'C:\\emacs\\bin\\runemacs.exe' )
+        icon = os.path.join( r'C:\\emacs\\etc\\icons\\emacs.ico' )
+        
+        #Create the shortcut
+        util.create_shortcut( lnk, target, icon_location=icon )
+
+    
+    Because the Windows API is being invoked to create the shortcut the 
+    arguments to this function closely corresponds to the 
+    `CreateShortcut <http://msdn.microsoft.com/en-us/library/xk6kst2k(v=vs.84).aspx>`_
+    scripting object. The arguments have the following meaning:
+    
+    :param lnk_file: A string indicating the file path of the shortcut \
+    file to be created (should end with a .lnk extension )
+    :param target_path: A string indicating file or directory the shortcut \
+    will point to.
+    :param arguments: A string representing any arguments that are to be \
+    passed to the target. For example a shortcut to python.exe that runs a \
+    module would need the argument string '-m module_name'.
+    :param working_directory: A string indicating the directory the target \
+    will start in (defaults to the directory containing the target path).
+    :param description: A string that gives a brief description of the \
+    shortcut, this message appears a the shortcut's tool-tip.
+    :param hotkey: A string representing the global key combination that will \
+    be associated with this shortcut. Can be any of the following: ALT+, \
+    CTRL+, SHIFT+, and/or a keyname. For example, 'CTRL+ALT+SHIFT+X' is a \
+    valid value.
+    :param icon_location: A string indicating the path to the file containing \
+    the shortcut's icon. By default is the target path is used.
+    :param icon_index: The zero based index of the icon inside the above \
+    mentioned file (default is 0).
+    :param window_style: Set the style of the window that will be shown. It \
+    must be either: 1 which displays the window in a "normal" state, 3 which \
+    displays a maximized window, or 7 which displays a minimized window.
+    
+    """
+    #Set the default values if necessary
+    if not os.path.exists( target_path ):
+        raise WinsyncException( 'Cannot create a shortcut to a '
+                                 'nonexistent file.' )
+    if not working_directory:
+        working_directory = os.path.dirname( target_path )
+    if not icon_location:
+        icon_location = target_path
+    if not icon_index:
+        icon_index = 0
+
+    #When pywin32 is around, drive the WScript.Shell COM object directly
+    #instead of generating a script for cscript.exe to run. Same
+    #properties, no process start and no temporary file.
+    try:
+        import win32com.client
+    except ImportError:
+        pass
+    else:
+        link = win32com.client.Dispatch( 'WScript.Shell' ).CreateShortcut(
+                                                                   lnk_file )
+        link.TargetPath = target_path
+        link.WorkingDirectory = working_directory
+
+        #Set the optional properties
+        if arguments:
+            link.Arguments = arguments
+        if icon_location:
+            link.IconLocation = '{},{}'.format( icon_location, icon_index )
+        if description:
+            link.Description = description
+        if hotkey:
+            link.Hotkey = hotkey
+        if window_style:
+            link.WindowStyle = window_style
+
+        link.Save()
+        return
+
+    #JScript needs / converted to \ and \ represented as \\
+    #This function makes the necessary adjustments
+    def fix_slashes(var):
+        if isinstance( var, str ):
+            var = var.replace( '/', '\\' ).replace( '\\', '\\\\' )
+        return var
+
+    lnk_file = fix_slashes( lnk_file )
+    target_path = fix_slashes( target_path )
+    arguments = fix_slashes( arguments )
+    working_directory = fix_slashes( working_directory )
+    description = fix_slashes( description )
+    hotkey = fix_slashes( hotkey )
+    icon_location = fix_slashes( icon_location )
+
+    #Figure out the temporary script file's path and name
+    script_file = os.path.join( os.environ['temp'], str(uuid.uuid4())+'.js' )
+
+    #Create the JScript file
+    with open( script_file, 'w' ) as script:
+        script.write( 'Shell = new ActiveXObject("WScript.Shell");\n' )
+        script.write( 'link = Shell.CreateShortcut("{}");\n'.format(lnk_file))
+        script.write( 'link.TargetPath = "{}";\n'.format( target_path ) )
+        script.write( 'link.WorkingDirectory = '
+                      '"{}";\n'.format( working_directory ) )
+        
+        #Set the optional properties
+        if arguments:
+            script.write( 'link.Arguments = "{}";\n'.format( arguments ) )
+        if icon_location:
+            script.write( 'link.IconLocation = "{},{}";\n'.format(
+                                    icon_location, icon_index ) )
+        if description:
+            script.write( 'link.Description = "{}";\n'.format( description ) )
+        if hotkey:
+            script.write( 'link.HotKey = "{}";\n'.format( hotkey ) )
+        if window_style:
+            script.write( 'link.WindowStyle = {};\n'.format( window_style ) )
+
+        script.write( 'link.Save();\n' )
+
+    #We need to make sure the script file is cleaned up, so wrap the process
+    #in a try-finally block.
+    try:
+        #Run our generated JScript file.
+        cscript = subprocess.Popen( ['cscript', '/nologo', script_file],
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT )
+        (stdout, stderr) = cscript.communicate()
+        
+        if cscript.returncode != 0:
+            raise WinsyncException('Failed to create shortcut. Reason:\n'
+                                    '{}'.format(stdout.decode('ascii')))
+    finally:
+        #Cleanup the script file
+        os.remove( script_file )
+    
+#The access rights the CACLS permission letters stand for, expressed as
+#the Win32 generic rights used by the in-process ACL path
+_CACLS_RIGHTS = { 'R': 0x80000000 | 0x20000000,  #GENERIC_READ | EXECUTE
+                  'W': 0x40000000,               #GENERIC_WRITE
+                  'C': 0x80000000 | 0x40000000   #Change is read, write,
+                       | 0x20000000 | 0x00010000,#execute and DELETE
+                  'F': 0x10000000 }              #GENERIC_ALL
+
+#Values of the Win32 ACCESS_MODE enumeration
+_GRANT_ACCESS = 1
+_SET_ACCESS = 2
+_DENY_ACCESS = 3
+_REVOKE_ACCESS = 4
+
+def _parse_cacls_options( options ):
+    """Translate a CACLS option list into the form the in-process ACL
+    path consumes. Returns an (edit, entries) pair where entries is a
+    list of (access_mode, account, access_mask) tuples. Options outside
+    the understood /E, /G, /P, /D and /R forms raise :exc:`ValueError`,
+    which tells the caller to hand the list to the real program instead.
+    """
+    edit = False
+    entries = []
+
+    opts = iter( options )
+    for opt in opts:
+        switch = opt.upper()
+
+        if switch == '/E':
+            edit = True
+        elif switch in ('/G', '/P'):
+            account, sep, perm = next( opts, '' ).rpartition( ':' )
+            if not sep or perm.upper() not in _CACLS_RIGHTS:
+                raise ValueError( opt )
+            mode = _GRANT_ACCESS if switch == '/G' else _SET_ACCESS
+            entries.append( (mode, account, _CACLS_RIGHTS[perm.upper()]) )
+        elif switch == '/D':
+            account = next( opts, '' )
+            if not account:
+                raise ValueError( opt )
+            entries.append( (_DENY_ACCESS, account, _CACLS_RIGHTS['F']) )
+        elif switch == '/R':
+            account = next( opts, '' )
+            if not account:
+                raise ValueError( opt )
+            entries.append( (_REVOKE_ACCESS, account, 0) )
+        else:
+            #/T, /C and anything else keep their cacls.exe semantics
+            raise ValueError( opt )
+
+    #CACLS only accepts /R together with /E, and an option list with no
+    #entries at all just prints the current ACL, which the native path
+    #cannot usefully reproduce
+    if not entries or ( not edit and
+                        any( mode == _REVOKE_ACCESS
+                             for mode, account, mask in entries ) ):
+        raise ValueError( options )
+
+    return edit, entries
+
+if sys.platform == 'win32':
+    import ctypes
+    import ctypes.wintypes
+
+    class _TRUSTEE_W( ctypes.Structure ):
+        _fields_ = [ ('pMultipleTrustee', ctypes.c_void_p),
+                     ('MultipleTrusteeOperation', ctypes.wintypes.DWORD),
+                     ('TrusteeForm', ctypes.wintypes.DWORD),
+                     ('TrusteeType', ctypes.wintypes.DWORD),
+                     ('ptstrName', ctypes.c_wchar_p) ]
+
+    class _EXPLICIT_ACCESS_W( ctypes.Structure ):
+        _fields_ = [ ('grfAccessPermissions', ctypes.wintypes.DWORD),
+                     ('grfAccessMode', ctypes.wintypes.DWORD),
+                     ('grfInheritance', ctypes.wintypes.DWORD),
+                     ('Trustee', _TRUSTEE_W) ]
+
+    def _set_file_acl( filename, edit, entries ):
+        """Apply the entries produced by :func:`_parse_cacls_options` to
+        the file's DACL through the Win32 security APIs. The account
+        names are resolved to SIDs and the ACL is rebuilt entirely
+        in-process, so no cacls.exe is ever launched.
+        """
+        advapi32 = ctypes.windll.advapi32
+        kernel32 = ctypes.windll.kernel32
+
+        TRUSTEE_IS_NAME = 1
+        SE_FILE_OBJECT = 1
+        DACL_SECURITY_INFORMATION = 0x00000004
+        PROTECTED_DACL_SECURITY_INFORMATION = 0x80000000
+
+        #SetEntriesInAcl looks the trustee names up itself, which saves
+        #a separate LookupAccountName round-trip per entry
+        access = ( _EXPLICIT_ACCESS_W * len(entries) )()
+        for entry, (mode, account, mask) in zip( access, entries ):
+            entry.grfAccessPermissions = mask
+            entry.grfAccessMode = mode
+            entry.grfInheritance = 0  #NO_INHERITANCE, rcacls walks itself
+            entry.Trustee.TrusteeForm = TRUSTEE_IS_NAME
+            entry.Trustee.ptstrName = account
+
+        old_dacl = ctypes.c_void_p()
+        descriptor = ctypes.c_void_p()
+        new_dacl = ctypes.c_void_p()
+
+        try:
+            #With /E the new entries are merged into the existing ACL,
+            #so that one has to be fetched first
+            if edit:
+                err = advapi32.GetNamedSecurityInfoW(
+                          filename, SE_FILE_OBJECT,
+                          DACL_SECURITY_INFORMATION, None, None,
+                          ctypes.byref( old_dacl ), None,
+                          ctypes.byref( descriptor ) )
+                if err != 0:
+                    raise WinsyncException( 'Could not read the ACL of '
+                                            '{}: {}'.format( filename,
+                                                             err ) )
+
+            err = advapi32.SetEntriesInAclW( len(entries), access,
+                                             old_dacl,
+                                             ctypes.byref( new_dacl ) )
+            if err != 0:
+                raise WinsyncException( 'Could not build the ACL for '
+                                        '{}: {}'.format( filename, err ) )
+
+            #Without /E CACLS throws the old ACL away, inherited entries
+            #included, which is what the protected flag does here
+            info = DACL_SECURITY_INFORMATION
+            if not edit:
+                info |= PROTECTED_DACL_SECURITY_INFORMATION
+
+            err = advapi32.SetNamedSecurityInfoW( filename, SE_FILE_OBJECT,
+                                                  info, None, None,
+                                                  new_dacl, None )
+            if err != 0:
+                raise WinsyncException( 'Could not set the ACL of '
+                                        '{}: {}'.format( filename, err ) )
+        finally:
+            kernel32.LocalFree( descriptor )
+            kernel32.LocalFree( new_dacl )
+else:
+    _set_file_acl = None
+
+def cacls( filename, options ):
+    """This function is a convenient wrapper for the CACLS program. The CACLS
+    program can be notoriously difficult to script because it sometimes
+    wants input but not always. This function takes much of the headache out
+    of using it. Here is an example::
+
+        link = r'C:\\Documents and Settings\\All Users\\Desktop\\jEdit.lnk'
+        util.cacls( link, ['/E', '/P', 'Student:R'] )
+        util.cacls( link, ['/E', '/G', 'Administrator:F'] )
+        util.cacls( link, ['/E', '/G', 'SYSTEM:F'] )
+
+    When the options stick to the common /E, /G, /P, /D and /R forms the
+    change is made directly through the Win32 security APIs without
+    starting a CACLS process at all. Anything the in-process path does
+    not understand is handed to the real program, which keeps its exact
+    semantics.
+
+    :param filename: This string represents what file or directory to run \
+    CACLS on.
+    :param options: A list of options to pass to the CACLS program.
+    """
+    if _set_file_acl is not None:
+        try:
+            edit, entries = _parse_cacls_options( options )
+        except ValueError:
+            pass
+        else:
+            _set_file_acl( filename, edit, entries )
+            return
+
+    cmdline = ['cacls', filename]
+    cmdline.extend( options )
+
+    #If you are not editing a permission, then you must allow it to go through
+    #by typing y on the command line. This variable will simulate it.
+    if '/E' not in options and '/e' not in options:
+        input = b'y\n'
+    else:
+        input = b''
+
+    with subprocess.Popen( cmdline, stdin=subprocess.PIPE,
+                           stdout=subprocess.PIPE,
+                           stderr=subprocess.STDOUT ) as proc:
+        (stdout, stderr) = proc.communicate( input )
+
+        if proc.returncode != 0:
+            config.logger.error('CACLS failed, reason '
+                                'given: {}'.format(stdout.decode('ascii')))
+            raise subprocess.CalledProcessError( returncode=proc.returncode,
+                                                 cmd=cmdline, output=stdout )
+
+def rcacls( directory, options, topdown=False ):
+    """This function calls the CACLS program on all the files and directories
+    within the given directory (including the passed in directory). The
+    options parameter should be a list of options to be passed onto the CACLS
+    program. Essentially this function does a :func:`os.walk` across all the
+    files and subdirectories, starting the bottom of the tree, calling the
+    :func:`cacls()` function on each one.
+    
+    You might wonder why you should use this function instead of just using the
+    /T option in CACLS. Basically, you can easily run into situations where you
+    lock a directory but not the files and subdirectories inside of it.
+    
+    For more information see :func:`cacls`.
+
+    The entries within each directory are processed concurrently, since
+    a CACLS run is dominated by its process start-up a handful of
+    workers multiplies the throughput. Directories are still finished
+    one at a time in walk order, so the locking order described above
+    is preserved.
+
+    :param topdown: This specifies the direction to walk through the directory.
+    """
+    max_workers = min( 32, (os.cpu_count() or 1) * 2 )
+
+    with concurrent.futures.ThreadPoolExecutor( max_workers=max_workers ) \
+            as executor:
+        for (dirpath, dirnames, filenames) in os.walk( directory,
+                                                       topdown=False ):
+            print( 'Processing directory: '+dirpath )
+
+            #Launch the whole directory's entries together, then wait
+            #for them all before moving to the next directory
+            futures = [ executor.submit( cacls,
+                                         os.path.join( dirpath, fname ),
+                                         options )
+                        for fname in filenames + dirnames ]
+
+            #result() re-raises any CACLS failure
+            for future in futures:
+                future.result()
+
+uac_installed = None
+def flip_uac():
+    """This function turns UAC on or off depending on its state. When the
+    function is first called, it first determines if UAC is installed and
+    what its current state is. If UAC is enabled, it will turn it off. If
+    UAC is off then it will leave it alone.
+    
+    When called a second time this function will return UAC to the state
+    it first found it in.
+    
+    If the system does not have UAC (e.g. Windows XP) then this function
+    will do nothing.
+    """
+    global uac_installed
+    global uac_state
+
+    #This is the first run of the function
+    if uac_installed is None:
+        try:
+            state = subprocess.check_output(['reg', 'QUERY', 
+                                             'HKEY_LOCAL_MACHINE\\SOFTWARE\\'
+                                             'Microsoft\\Windows\\'
+                                             'CurrentVersion\\Policies\\'
+                                             'System',
+                                              '/v', 'EnableLUA'] )
+        except:
+            #This occurs when the machine does not have UAC
+            uac_installed = False
+            return
+
+        state = state.decode( 'ascii' )
+        
+        #If there was no error then UAC is installed
+        uac_installed = 'ERROR' not in state
+        
+        if '0x1' in state:
+            uac_state = True
+        else:
+            #Since the initial condition is that UAC exists but
+            #it is turned off, then just don't do any flipping
+            uac_state = False
+            uac_installed = False
+            
+
+    if uac_installed:
+        #Rotate the state so we set it to its oposite
+        uac_state = not uac_state
+        
+        subprocess.check_call( ['reg', 'ADD', 
+                                'HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\'
+                                'Windows\\CurrentVersion\\Policies\\System',
+                                '/v', 'EnableLUA', '/t', 'REG_DWORD', '/d',
+                                str(int(uac_state)), '/f'],
+                                stdout=subprocess.PIPE )
+
+#Stubs until I can update
+def countdown(seconds, message='Waiting {} seconds'):
+    pass
+def create_shortcut( lnk_file, target_path, arguments=None,
+                     working_directory=None, description=None,
+                     hotkey=None, icon_location=None, icon_index=None,
+                     window_style=None ):
+    pass
+
+def is_admin():
+    pass
+
+def get_special_folder(name):
+    return ''
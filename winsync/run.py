@@ -225,7 +225,12 @@ def process_queue(queue):
         
         #Switch the current directory back
         os.chdir(original_dir)
-        
+
+        #The action just changed what is installed, so the memoized
+        #registry lookups must be thrown away or the post-action check
+        #would see the pre-action state
+        util.uninstall_info.cache_clear()
+
         #We need to check that the process really worked
         logger.debug('Checking that the installer functioned correctly')
         if (package.method != 'remove' and not installer.check()) or \